@@ -0,0 +1,148 @@
+import json
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+
+from app.initializer import mongo
+from app.database.mongo import ensure_indexes, index_usage, find_collection_scans
+from app.services.user_service import UserService
+from app.services.rollup_service import RollupService
+from app.services.feature_encoder_service import check_parity
+from app.services.model_registry_service import model_registry
+from app.services.association_rules_service import AssociationRulesService
+from app.services.measurement_count_service import MeasurementCountService
+from app.controllers.area_information import (
+    avoided_co2_pipeline, tree_pipeline, soil_pipeline, tree_status_pipeline, environmental_threats_pipeline,
+    first_measurement_pipeline, funding_pipeline, latest_tree_health_pipeline, survival_by_area_pipeline
+)
+
+users_cli = AppGroup('users', help='Manutenção dos dados de usuários.')
+
+
+@users_cli.command('backfill-email-index')
+@click.option('--batch-size', default=500, show_default=True, help='Usuários processados por commit.')
+def backfill_email_index(batch_size):
+    """Preenche o índice cego de e-mail dos usuários existentes."""
+    updated = UserService.backfill_email_index(batch_size=batch_size)
+    click.echo(f'{updated} usuário(s) atualizado(s).')
+
+
+@users_cli.command('upgrade-encryption')
+@click.option('--batch-size', default=500, show_default=True, help='Usuários processados por commit.')
+def upgrade_encryption(batch_size):
+    """Migra os dados pessoais do formato RSA por campo para o envelope AES-GCM."""
+    updated = UserService.upgrade_all_encryption(batch_size=batch_size)
+    click.echo(f'{updated} usuário(s) migrado(s).')
+
+
+rollup_cli = AppGroup('rollup', help='Manutenção do rollup mensal de medições (api_monthly).')
+
+
+@rollup_cli.command('rebuild')
+def rebuild_rollup():
+    """Reconstrói a coleção api_monthly a partir de todas as medições."""
+    count = RollupService.rebuild()
+    click.echo(f'{count} documento(s) mensais gerados.')
+
+
+mongo_cli = AppGroup('mongo', help='Manutenção dos índices do Mongo.')
+
+
+@mongo_cli.command('ensure-indexes')
+def ensure_mongo_indexes():
+    """Cria (de forma idempotente) os índices das coleções de medições."""
+    for collection, names in ensure_indexes(mongo.db).items():
+        click.echo(f'{collection}: {", ".join(names)}')
+
+
+def _endpoint_queries():
+    """
+    Consultas dos endpoints montadas pelos mesmos builders que eles usam, com filtros de exemplo.
+    """
+    sample_area_ids = [1, 2]
+    sample_start, sample_end = datetime(2000, 1, 1), datetime(2100, 1, 1)
+    raw_params = {"granularity": "day", "start_date": "2000-01-01", "end_date": "2100-01-01"}
+    monthly_params = {**raw_params, "granularity": "month"}
+
+    queries = []
+    for endpoint, builder in (
+            ("GET /area-information/", avoided_co2_pipeline),
+            ("GET /area-information/tree", tree_pipeline),
+            ("GET /area-information/soil", soil_pipeline),
+            ("GET /area-information/tree/status", tree_status_pipeline),
+            ("GET /area-information/environmental-threats", environmental_threats_pipeline)):
+        for params, area_id in ((raw_params, None), (raw_params, 1), (monthly_params, 1)):
+            collection, pipeline = builder(params, area_id)
+            label = f"{endpoint} ({params['granularity']}{', area_id' if area_id else ''})"
+            queries.append((label, collection.name, {"aggregate": pipeline}))
+
+    collection, pipeline = survival_by_area_pipeline({}, sample_area_ids)
+    queries += [
+        ("GET /area-information/average-tree-survival", collection.name, {"aggregate": pipeline}),
+        ("GET /area-information/total-planted-trees", "api", {
+            "aggregate": first_measurement_pipeline(sample_area_ids, sample_start, sample_end)
+        }),
+        ("GET /area-information/funding_by_uf_year", "api", {"aggregate": funding_pipeline(sample_area_ids, 2024)}),
+        ("GET /area-information/tree-health", "api", {"aggregate": latest_tree_health_pipeline()}),
+        ("GET /reforestation/stages", "api", {
+            "aggregate": MeasurementCountService.count_pipeline("stage_indicator", sample_area_ids)
+        }),
+        ("GET /threats/", "api", {
+            "aggregate": MeasurementCountService.count_pipeline("environmental_threats", sample_area_ids, ["Incêndios"])
+        }),
+        ("GET /threats/threats_by_state (all)", "api", {
+            "aggregate": MeasurementCountService.count_pipeline("environmental_threats")
+        }),
+        ("GET /threats/threats_by_state", "api", {
+            "aggregate": MeasurementCountService.count_pipeline("environmental_threats", values=["Incêndios"])
+        }),
+        ("GET /areas/search", "api", {"find": {"area_id": {"$in": sample_area_ids}}}),
+        ("get_city_coordinates", "api_cities_coordinates", {"find": {"NOME_MUNICIPIO": "SAO PAULO"}}),
+    ]
+    return queries
+
+
+@mongo_cli.command('index-report')
+def mongo_index_report():
+    """Mostra o uso dos índices e as consultas dos endpoints que fazem COLLSCAN."""
+    report = {
+        "index_usage": index_usage(mongo.db),
+        "queries": find_collection_scans(mongo.db, _endpoint_queries())
+    }
+    click.echo(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+ml_cli = AppGroup('ml', help='Verificações dos modelos de machine learning.')
+
+
+@ml_cli.command('check-encoder')
+def check_encoder():
+    """Confere se o OneHotEncoder gera a mesma matriz que a codificação com get_dummies."""
+    encoder = model_registry.get().encoder
+
+    count, mismatches = check_parity(encoder)
+    if mismatches:
+        click.echo(json.dumps(mismatches, indent=2, ensure_ascii=False))
+        raise click.ClickException(f'{len(mismatches)} divergência(s) em {count} registro(s).')
+    click.echo(f'OK: {count} registro(s), {encoder.n_features} coluna(s) idênticas.')
+
+
+@ml_cli.command('mine-rules')
+@click.option('--force', is_flag=True, help='Minera mesmo sem medições novas suficientes.')
+def mine_rules(force):
+    """Minera as regras de associação e grava em ml_association_rules."""
+    result = AssociationRulesService.refresh(force=force)
+    if result is None:
+        click.echo(f'Nada a fazer: {AssociationRulesService.new_measurements()} medição(ões) nova(s) '
+                   f'desde a última mineração.')
+        return
+    click.echo(f'{len(result["rules"])} regra(s) de {result["rows_mined"]} medição(ões) em {result["elapsed_ms"]} ms.')
+
+
+def register_commands(app):
+    """
+    Registra os grupos de comandos no CLI do Flask.
+    """
+    for group in (users_cli, rollup_cli, mongo_cli, ml_cli):
+        app.cli.add_command(group)
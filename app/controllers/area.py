@@ -11,6 +11,7 @@ from app.initializer import app, mongo
 from app.database import db
 from app.models import Area, Localization, Company
 from app.schemas import AreaSchema, AreaExtendedSchema, AreaListSchema, AreaGeoSchema
+from app.services.response_cache_service import response_cache
 
 areas = Blueprint("areas", __name__, url_prefix=app.config["API_URL_PREFIX"] + "/areas")
 
@@ -134,6 +135,7 @@ def post():
         setattr(new_company, field, data[field])
     db.session.add(new_company)
     db.session.commit()
+    response_cache.bump()
     return {"msg": "ok"}
 
 
@@ -146,6 +148,7 @@ def delete(id):
 
     db.session.delete(area)
     db.session.commit()
+    response_cache.bump()
 
     return {"message": "Area deleted successfully"}, 200
 
@@ -164,6 +167,7 @@ def update(id):
     try:
         updated_area = AreaSchema().load(data, instance=area, partial=True)
         db.session.commit()
+        response_cache.bump()
         return AreaSchema().dump(updated_area), 200
     except ValidationError as err:
         return {"errors": err.messages}, 400
@@ -4,6 +4,7 @@ from flasgger import swag_from
 from flask_jwt_extended import jwt_required
 
 from datetime import datetime
+from functools import lru_cache
 
 from sqlalchemy import func
 
@@ -14,6 +15,9 @@ from app.models import Area, Localization
 from app.util.messages import Messages
 from app.initializer import app, mongo
 from app.util.utils import convert_dict_keys_to_camel_case
+from app.services.rollup_service import RollupService
+from app.services.response_cache_service import response_cache
+from app.services.association_rules_service import AssociationRulesService
 
 
 area_information = Blueprint(
@@ -21,6 +25,355 @@ area_information = Blueprint(
 )
 
 
+GRANULARITY_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",
+    "month": "%Y-%m",
+    "quarter": "%Y-%m",
+    "year": "%Y",
+}
+
+# Granularidades que podem ser respondidas a partir do rollup mensal
+ROLLUP_GRANULARITIES = ("month", "quarter", "year")
+
+
+def _rollup_filters(area_id, params, default_end_date=None, default_start_date='2000-01-01'):
+    """
+    Filtros para o rollup mensal (api_monthly), ou None quando o período não cobre
+    meses inteiros e a consulta precisa ir às medições brutas. Sem end_date, usa
+    default_end_date como limite superior (o mês corrente entra inteiro); sem
+    start_date, usa default_start_date (None = sem limite inferior), os mesmos
+    limites da consulta às medições brutas de cada endpoint.
+    """
+    start = params.get('start_date', default_start_date)
+    start_date = datetime.strptime(start, "%Y-%m-%d") if start else None
+    end_date = datetime.strptime(params['end_date'], "%Y-%m-%d") if params.get('end_date') else None
+
+    if (start_date and start_date.day != 1) or (end_date and end_date.day != 1):
+        return None
+
+    end_date = end_date or default_end_date
+    filters = {}
+    if start_date:
+        filters.setdefault("month", {})["$gte"] = start_date
+    if end_date:
+        filters.setdefault("month", {})["$lt"] = end_date
+    if area_id:
+        filters["area_id"] = int(area_id)
+    return filters
+
+
+@lru_cache(maxsize=None)
+def _normalize_soil_type(soil_type):
+    """
+    Tipo de solo sem acentos e em minúsculas (ex.: "Argiloso" -> "argiloso").
+    """
+    return unidecode(soil_type).lower()
+
+
+def _date_bucket(date_field, granularity):
+    """
+    Expressão que trunca a data na granularidade pedida e a formata como texto
+    (ex.: "2024-07" para month), sem converter cada documento com $substr.
+    """
+    trunc = {"date": date_field, "unit": granularity}
+    if granularity == "week":
+        trunc["startOfWeek"] = "monday"
+    return {"$dateToString": {"format": GRANULARITY_FORMATS[granularity], "date": {"$dateTrunc": trunc}}}
+
+
+def build_bucket_pipeline(params, area_id, raw_group, rollup_group, raw_keys=None, rollup_keys=None,
+                          rollup_unwind=None, rollup_post=None, ordered=False):
+    """
+    Monta o início dos pipelines dos gráficos: $match, $sort opcional e $group com
+    _id.measurement_date no balde da granularidade (day, week, month, quarter ou year).
+    Usa o rollup mensal quando a granularidade e o período permitem e ele já foi construído.
+    Com ordered=True as medições são ordenadas por data antes do $group (servido pelo
+    índice), para que $first devolva a medição mais antiga.
+    Retorna (coleção, pipeline).
+    """
+    granularity = params.get('granularity', 'month')
+    if granularity not in GRANULARITY_FORMATS:
+        raise KeyError('granularity')
+
+    # Mesmo limite superior das medições brutas quando end_date não é informado: hoje
+    today = datetime.strptime(datetime.now().strftime('%Y-%m-%d'), "%Y-%m-%d")
+    rollup_filters = _rollup_filters(area_id, params, default_end_date=today) \
+        if granularity in ROLLUP_GRANULARITIES and RollupService.is_ready() else None
+
+    if rollup_filters is not None:
+        pipeline = [{"$match": rollup_filters}]
+        if ordered:
+            pipeline.append({"$sort": {"month": 1, "first.measurement_date": 1}})
+        if rollup_unwind:
+            pipeline.append({"$unwind": rollup_unwind})
+        pipeline.append({"$group": {
+            "_id": {"measurement_date": _date_bucket("$month", granularity), **(rollup_keys or {})},
+            **rollup_group
+        }})
+        pipeline.extend(rollup_post or [])
+        return mongo.db.api_monthly, pipeline
+
+    start_date = datetime.strptime(params.get('start_date', '2000-01-01'), "%Y-%m-%d")
+    end_date = datetime.strptime(params['end_date'], "%Y-%m-%d") if params.get('end_date') else today
+
+    filters = {"measurement_date": {"$gte": start_date, "$lt": end_date}}
+    if area_id:
+        filters['area_id'] = int(area_id)
+
+    pipeline = [{"$match": filters}]
+    if ordered:
+        pipeline.append({"$sort": {"measurement_date": 1}})
+    pipeline.append({"$group": {
+        "_id": {"measurement_date": _date_bucket("$measurement_date", granularity), **(raw_keys or {})},
+        **raw_group
+    }})
+    return mongo.db.api, pipeline
+
+
+def avoided_co2_pipeline(params, area_id):
+    """
+    Pipeline de GET /area-information/: CO2 evitado por período.
+    """
+    collection, pipeline = build_bucket_pipeline(
+        params, area_id,
+        raw_group={"total_avoided_co2": {"$sum": "$avoided_co2_emissions_cubic_meters"}},
+        rollup_group={"total_avoided_co2": {"$sum": "$sums.avoided_co2_emissions_cubic_meters"}}
+    )
+    pipeline += [
+        {"$sort": {"_id.measurement_date": 1}},
+        {"$project": {"_id": 0, "measurement_date": "$_id.measurement_date", "total_avoided_co2": 1}}
+    ]
+    return collection, pipeline
+
+
+def tree_pipeline(params, area_id):
+    """
+    Pipeline de GET /area-information/tree: árvores perdidas, vivas e taxa de sobrevivência por período.
+    """
+    collection, pipeline = build_bucket_pipeline(
+        params, area_id,
+        raw_group={
+            "total_number_of_trees_lost": {"$sum": "$number_of_trees_lost"},
+            "total_living_trees_to_date": {"$sum": "$living_trees_to_date"}
+        },
+        rollup_group={
+            "total_number_of_trees_lost": {"$sum": "$sums.number_of_trees_lost"},
+            "total_living_trees_to_date": {"$sum": "$sums.living_trees_to_date"}
+        }
+    )
+    pipeline += [
+        {"$sort": {"_id.measurement_date": 1}},
+        {"$project": {
+            "_id": 0,
+            "measurement_date": "$_id.measurement_date",
+            "total_number_of_trees_lost": 1,
+            "total_living_trees_to_date": 1,
+            "survival_rate": {
+                "$round": [
+                    {
+                        "$cond": {
+                            "if": {
+                                "$eq": [
+                                    {"$add": ["$total_number_of_trees_lost", "$total_living_trees_to_date"]}, 0
+                                ]
+                            },
+                            "then": 0,
+                            "else": {
+                                "$divide": [
+                                    "$total_living_trees_to_date",
+                                    {
+                                        "$add": ["$total_number_of_trees_lost", "$total_living_trees_to_date"]
+                                    }
+                                ]
+                            }
+                        }
+                    },
+                    4
+                ]
+            }
+        }}
+    ]
+    return collection, pipeline
+
+
+def soil_pipeline(params, area_id):
+    """
+    Pipeline de GET /area-information/soil: fertilidade média do solo por período e adubação.
+    """
+    collection, pipeline = build_bucket_pipeline(
+        params, area_id,
+        raw_keys={"fertilization": "$fertilization"},
+        raw_group={"avg_soil_fertility_index_percent": {"$avg": "$soil_fertility_index_percent"}},
+        rollup_unwind="$fertilization",
+        rollup_keys={"fertilization": "$fertilization.value"},
+        rollup_group={
+            "sum_soil_fertility_index_percent": {"$sum": "$fertilization.sum_soil_fertility_index_percent"},
+            "soil_fertility_count": {"$sum": "$fertilization.soil_fertility_count"}
+        },
+        rollup_post=[{
+            "$set": {
+                "avg_soil_fertility_index_percent": {
+                    "$cond": [
+                        {"$eq": ["$soil_fertility_count", 0]},
+                        None,
+                        {"$divide": ["$sum_soil_fertility_index_percent", "$soil_fertility_count"]}
+                    ]
+                }
+            }
+        }]
+    )
+    pipeline += [
+        {"$sort": {"_id.measurement_date": 1, "_id.fertilization": 1}},
+        {
+            "$project": {
+                "_id": 0,
+                "measurement_date": "$_id.measurement_date",
+                "fertilization": "$_id.fertilization",
+                "avg_soil_fertility_index_percent": {
+                    "$round": ["$avg_soil_fertility_index_percent", 2]
+                }
+            }
+        }
+    ]
+    return collection, pipeline
+
+
+def tree_status_pipeline(params, area_id):
+    """
+    Pipeline de GET /area-information/tree/status: primeiro estado de saúde das árvores por período.
+    """
+    collection, pipeline = build_bucket_pipeline(
+        params, area_id,
+        raw_group={
+            "area_id": {"$first": "$area_id"},
+            "tree_health_status": {"$first": "$tree_health_status"}
+        },
+        rollup_group={
+            "area_id": {"$first": "$area_id"},
+            "tree_health_status": {"$first": "$first.tree_health_status"}
+        },
+        ordered=True
+    )
+    pipeline += [
+        {"$sort": {"_id.measurement_date": 1}},
+        {
+            "$project": {
+                "_id": 0,
+                "measurement_date": "$_id.measurement_date",
+                "area_id": "$area_id",
+                "tree_health_status": "$tree_health_status"
+            }
+        }
+    ]
+    return collection, pipeline
+
+
+def environmental_threats_pipeline(params, area_id):
+    """
+    Pipeline de GET /area-information/environmental-threats: primeira ameaça registrada por área e período.
+    """
+    collection, pipeline = build_bucket_pipeline(
+        params, area_id,
+        raw_keys={"area_id": "$area_id"},
+        raw_group={"environmental_threats": {"$first": "$environmental_threats"}},
+        rollup_keys={"area_id": "$area_id"},
+        rollup_group={"environmental_threats": {"$first": "$first.environmental_threats"}},
+        ordered=True
+    )
+    pipeline += [
+        {"$sort": {"_id.measurement_date": 1, "_id.area_id": 1}},
+        {
+            "$project": {
+                "_id": 0,
+                "measurement_date": "$_id.measurement_date",
+                "area_id": "$_id.area_id",
+                "environmental_threats": "$environmental_threats"
+            }
+        }
+    ]
+    return collection, pipeline
+
+
+def first_measurement_pipeline(area_ids, start_date, end_date):
+    """
+    Pipeline de GET /area-information/total-planted-trees: primeira medição de cada área no período.
+    """
+    return [
+        {"$match": {
+            "area_id": {"$in": list(area_ids)},
+            "measurement_date": {"$gte": start_date, "$lte": end_date}
+        }},
+        {"$sort": {"measurement_date": 1}},
+        {"$group": {
+            "_id": "$area_id",
+            "first_measurement": {"$first": "$measurement_date"}
+        }}
+    ]
+
+
+def year_filter(year=None):
+    """
+    Filtro de medições do ano informado (vazio sem ano).
+    """
+    if not year:
+        return {}
+    return {"measurement_date": {"$gte": datetime(year, 1, 1), "$lt": datetime(year + 1, 1, 1)}}
+
+
+def funding_pipeline(area_ids=None, year=None):
+    """
+    Pipeline de GET /area-information/funding_by_uf_year: custo total por fonte de financiamento.
+    """
+    mongo_query = {"funding_source": {"$ne": None}, **year_filter(year)}
+    if area_ids is not None:
+        mongo_query["area_id"] = {"$in": list(area_ids)}
+
+    return [
+        {"$match": mongo_query},
+        {"$group": {"_id": "$funding_source", "total": {"$sum": "$total_project_cost_brl"}}}
+    ]
+
+
+def latest_tree_health_pipeline():
+    """
+    Pipeline de GET /area-information/tree-health: estado de saúde mais recente de cada área.
+    """
+    return [
+        {"$sort": {"measurement_date": -1}},
+        {"$group": {"_id": "$area_id", "tree_health_status": {"$first": "$tree_health_status"}}}
+    ]
+
+
+def survival_by_area_pipeline(params, area_ids=None):
+    """
+    Pipeline de GET /area-information/average-tree-survival: soma e quantidade das taxas
+    de sobrevivência por área, no rollup quando ele está pronto e o período cobre meses inteiros.
+    Retorna (coleção, pipeline).
+    """
+    # Sem start_date/end_date a consulta às medições brutas não tem limites; o rollup também não
+    rollup_filters = _rollup_filters(None, params, default_start_date=None) if RollupService.is_ready() else None
+    if rollup_filters is not None:
+        collection = mongo.db.api_monthly
+        match = rollup_filters
+        survival_sum, survival_count = "$sums.tree_survival_rate", "$count"
+    else:
+        collection = mongo.db.api
+        match = {"measurement_date": {"$gte": datetime.strptime(params["start_date"], "%Y-%m-%d")}} \
+            if params.get("start_date") else {}
+        if params.get("end_date"):
+            match.setdefault("measurement_date", {})["$lt"] = datetime.strptime(params["end_date"], "%Y-%m-%d")
+        survival_sum, survival_count = "$tree_survival_rate", 1
+
+    if area_ids is not None:
+        match["area_id"] = {"$in": list(area_ids)}
+
+    return collection, [
+        {"$match": match},
+        {"$group": {"_id": "$area_id", "sum": {"$sum": survival_sum}, "count": {"$sum": survival_count}}}
+    ]
+
+
 @area_information.route("/", methods=["GET"])
 @jwt_required()
 @swag_from({
@@ -48,6 +401,13 @@ area_information = Blueprint(
             'required': False,
             'schema': {'type': 'string', 'format': 'date'},
             'description': 'End date for filtering (YYYY-MM-DD)'
+        },
+        {
+            'name': 'granularity',
+            'in': 'query',
+            'required': False,
+            'schema': {'type': 'string', 'enum': ['day', 'week', 'month', 'quarter', 'year'], 'default': 'month'},
+            'description': 'Date bucket used to group the measurements'
         }
     ],
     'responses': {
@@ -74,33 +434,12 @@ area_information = Blueprint(
 })
 def get_all_by():
     try:
-        filters = {}
         params = request.args
         area_id = params.get('area_id', None)
-        start_date = datetime.strptime(params.get('start_date', '2000-01-01'), "%Y-%m-%d")
-        end_date = datetime.strptime(params.get('end_date', datetime.now().strftime('%Y-%m-%d')), "%Y-%m-%d")
-
-        if area_id:
-            filters['area_id'] = int(area_id)
 
-        filters['measurement_date'] = {
-            "$gte": start_date,
-            "$lt": end_date
-        }
+        collection, pipeline = avoided_co2_pipeline(params, area_id)
 
-        pipeline = [
-            {"$match": filters},
-            {
-                "$group": {
-                    "_id": {"$substr": ["$measurement_date", 0, 7]},
-                    "total_avoided_co2": {"$sum": "$avoided_co2_emissions_cubic_meters"}
-                }
-            },
-            {"$sort": {"_id": 1}},
-            {"$project": {"_id": 0, "measurement_date": "$_id", "total_avoided_co2": 1}}
-        ]
-
-        area_info = list(mongo.db.api.aggregate(pipeline))
+        area_info = list(collection.aggregate(pipeline))
         return jsonify(area_info)
 
     except KeyError as error:
@@ -133,6 +472,11 @@ def save_area_information():
             a['measurement_date'] = datetime.strptime(a["measurement_date"], "%Y-%m-%d")
             mongo.db.api.insert_one(a)
 
+        RollupService.refresh_for(data)
+        response_cache.bump()
+        AssociationRulesService.record_inserted(len(data))
+        AssociationRulesService.schedule_refresh()
+
         return jsonify({"msg": Messages.SUCCESS_SAVE_SUCCESSFULLY('Area Information')})
     
     except KeyError as error:
@@ -141,6 +485,36 @@ def save_area_information():
         abort(500, description=Messages.UNKNOWN_ERROR('Area Information'))
 
 
+@area_information.route("/cache-stats", methods=["GET"])
+@swag_from({
+    'tags': ['Area Information'],
+    'summary': 'Dashboard response cache statistics',
+    'description': 'Returns the size, version and hit/miss counters of the cache used by the dashboard aggregation endpoints.',
+    'responses': {
+        200: {
+            'description': 'Cache statistics',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'max_size': 512,
+                        'ttl_seconds': 600,
+                        'entries': 14,
+                        'version': 3,
+                        'hits': 230,
+                        'misses': 41,
+                        'hit_rate': 0.8487,
+                        'invalidations': 3
+                    }
+                }
+            }
+        }
+    }
+})
+@jwt_required()
+def get_cache_stats():
+    return response_cache.stats(), 200
+
+
 @area_information.route("/tree", methods=["GET"])
 @jwt_required()
 @swag_from({
@@ -170,6 +544,14 @@ def save_area_information():
             'format': 'date',
             'description': 'End date of the date range to filter the data (YYYY-MM-DD). Default is the current date.',
             'required': False
+        },
+        {
+            'name': 'granularity',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['day', 'week', 'month', 'quarter', 'year'],
+            'description': 'Date bucket used to group the measurements. Default is month.',
+            'required': False
         }
     ],
     'responses': {
@@ -211,62 +593,12 @@ def save_area_information():
 })
 def get_tree_information():
     try:
-        filters = {}
         params = request.args
         area_id = params.get('area_id', False)
-        start_date = datetime.strptime(params.get('start_date', '2000-01-01'), "%Y-%m-%d")
-        end_date = datetime.strptime(params.get('end_date', datetime.now().strftime('%Y-%m-%d')), "%Y-%m-%d")
 
-        if area_id:
-            filters['area_id'] = int(area_id)
-
-        filters['measurement_date'] = {
-            "$gte": start_date,
-            "$lt": end_date
-        }
-
-        pipeline = [
-            {"$match": filters},
-            {
-                "$group": {
-                    "_id": {"$substr": ["$measurement_date", 0, 7]},
-                    "total_number_of_trees_lost": {"$sum": "$number_of_trees_lost"},
-                    "total_living_trees_to_date": {"$sum": "$living_trees_to_date"}
-                }
-            },
-            {"$sort": {"_id": 1}},
-            {"$project": {
-                "_id": 0,
-                "measurement_date": "$_id",
-                "total_number_of_trees_lost": 1,
-                "total_living_trees_to_date": 1,
-                "survival_rate": {
-                    "$round": [
-                        {
-                            "$cond": {
-                                "if": {
-                                    "$eq": [
-                                        {"$add": ["$total_number_of_trees_lost", "$total_living_trees_to_date"]}, 0
-                                    ]
-                                },
-                                "then": 0,
-                                "else": {
-                                    "$divide": [
-                                        "$total_living_trees_to_date",
-                                        {
-                                            "$add": ["$total_number_of_trees_lost", "$total_living_trees_to_date"]
-                                        }
-                                    ]
-                                }
-                            }
-                        },
-                        4
-                    ]
-                }
-            }}
-        ]
+        collection, pipeline = tree_pipeline(params, area_id)
 
-        tree_info = list(mongo.db.api.aggregate(pipeline))
+        tree_info = list(collection.aggregate(pipeline))
         return jsonify(tree_info)
 
     except KeyError as error:
@@ -304,6 +636,14 @@ def get_tree_information():
             'format': 'date',
             'description': 'End date of the date range to filter the data (YYYY-MM-DD). Default is the current date.',
             'required': False
+        },
+        {
+            'name': 'granularity',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['day', 'week', 'month', 'quarter', 'year'],
+            'description': 'Date bucket used to group the measurements. Default is month.',
+            'required': False
         }
     ],
     'responses': {
@@ -343,45 +683,12 @@ def get_tree_information():
 })
 def get_soil_information():
     try:
-        filters = {}
         params = request.args
         area_id = params.get('area_id', False)
-        start_date = datetime.strptime(params.get('start_date', '2000-01-01'), "%Y-%m-%d")
-        end_date = datetime.strptime(params.get('end_date', datetime.now().strftime('%Y-%m-%d')), "%Y-%m-%d")
-
-        if area_id:
-            filters['area_id'] = int(area_id)
 
-        filters['measurement_date'] = {
-            "$gte": start_date,
-            "$lt": end_date
-        }
-
-        pipeline = [
-            {"$match": filters},
-            {
-                "$group": {
-                    "_id": {
-                        "measurement_date": {"$substr": ["$measurement_date", 0, 7]},
-                        "fertilization": "$fertilization"
-                    },
-                    "avg_soil_fertility_index_percent": {"$avg": "$soil_fertility_index_percent"}
-                }
-            },
-            {"$sort": {"_id.measurement_date": 1, "_id.fertilization": 1}},
-            {
-                "$project": {
-                    "_id": 0,
-                    "measurement_date": "$_id.measurement_date",
-                    "fertilization": "$_id.fertilization",
-                    "avg_soil_fertility_index_percent": {
-                        "$round": ["$avg_soil_fertility_index_percent", 2]
-                    }
-                }
-            }
-        ]
+        collection, pipeline = soil_pipeline(params, area_id)
 
-        area_info = list(mongo.db.api.aggregate(pipeline))
+        area_info = list(collection.aggregate(pipeline))
         return jsonify(area_info)
     except KeyError as error:
         abort(400, description=Messages.ERROR_INVALID_DATA('Area Information'))
@@ -451,6 +758,7 @@ def get_soil_information():
         }
     }
 })
+@response_cache.cached
 def get_total_planted_trees():
     try:
         uf = request.args.get("uf")
@@ -473,18 +781,7 @@ def get_total_planted_trees():
         if not area_ids:
             return jsonify({"total_trees": 0})
 
-        pipeline = [
-            {"$match": {
-                "area_id": {"$in": list(area_ids.keys())},
-                "measurement_date": {"$gte": start_date_dt, "$lte": end_date_dt}
-            }},
-            {"$sort": {"measurement_date": 1}},
-            {"$group": {
-                "_id": "$area_id",
-                "first_measurement": {"$first": "$measurement_date"}
-            }}
-        ]
-
+        pipeline = first_measurement_pipeline(area_ids.keys(), start_date_dt, end_date_dt)
         first_measurements = list(mongo.db.api.aggregate(pipeline))
 
         valid_area_ids = {entry["_id"] for entry in first_measurements}
@@ -549,6 +846,7 @@ def get_species_trees():
 })
 @area_information.route("/reforested-area-summary", methods=["GET"])
 @jwt_required()
+@response_cache.cached
 def get_reforested_area_summary():
     query = (
         db.session.query(
@@ -635,41 +933,40 @@ def get_reforested_area_summary():
 })
 @area_information.route("/funding_by_uf_year", methods=["GET"])
 @jwt_required()
+@response_cache.cached
 def get_funding_by_uf_year():
     uf = request.args.get("uf", type=str)
     year = request.args.get("year", type=int)
 
-    mongo_query = {}
-    if year:
-        mongo_query["measurement_date"] = {
-            "$gte": datetime(year, 1, 1),
-            "$lt": datetime(year + 1, 1, 1),
-        }
-    mongo_data = list(mongo.db.api.find(mongo_query, {"area_id": 1, "funding_source": 1, "total_project_cost_brl": 1, "_id": 0}))
-
-    if not mongo_data:
-        return jsonify({"error": "Nenhum dado encontrado para os filtros fornecidos."}), 404
-
-    df = pd.DataFrame(mongo_data)
-
+    area_ids = None
     if uf:
-        areas = db.session.query(Area.id, Localization.uf).join(Localization, Area.localization_id == Localization.id).all()
-        area_uf_map = {area.id: area.uf.lower() for area in areas}
-        df["uf"] = df["area_id"].map(area_uf_map)
+        area_ids = [
+            area.id for area in db.session.query(Area.id)
+            .join(Localization, Area.localization_id == Localization.id)
+            .filter(Localization.uf == uf.upper())
+        ]
 
-        df = df[df["uf"] == uf.lower()]
+    # UF sem áreas: nada a agregar, a resposta é o resultado vazio abaixo
+    funding_totals = {
+        doc["_id"]: doc["total"]
+        for doc in mongo.db.api.aggregate(funding_pipeline(area_ids, year))
+    } if area_ids != [] else {}
 
-    funding_totals = df.groupby("funding_source")["total_project_cost_brl"].sum()
+    # 404 só quando o ano não tem medições; sem fontes para a UF (ou sem funding_source) o total é 0
+    if not funding_totals and mongo.db.api.find_one(year_filter(year), {"_id": 1}) is None:
+        return jsonify({"error": "Nenhum dado encontrado para os filtros fornecidos."}), 404
 
-    total = funding_totals.sum()
-    funding_percentages = (funding_totals / total * 100).round(2)
+    total = sum(funding_totals.values())
 
     result = {
         "uf": uf.lower() if uf else "all",
         "year": year if year else "all",
         "total": total,
         "funding_sources": {
-            source.lower().replace(" ", "_"): {"total": float(value), "percent": float(funding_percentages[source])}
+            source.lower().replace(" ", "_"): {
+                "total": float(value),
+                "percent": round(value / total * 100, 2) if total else 0.0
+            }
             for source, value in funding_totals.items()
         }
     }
@@ -691,6 +988,7 @@ def get_funding_by_uf_year():
 })
 @area_information.route("/tree-health", methods=["GET"])
 @jwt_required()
+@response_cache.cached
 def get_area_tree_health():
     query = db.session.query(
         Area.id,
@@ -700,10 +998,7 @@ def get_area_tree_health():
 
     df_sql = pd.DataFrame(query, columns=["area_id", "planting_techniques", "trees_planted"])
 
-    mongo_data = mongo.db.api.aggregate([
-        {"$sort": {"measurement_date": -1}},
-        {"$group": {"_id": "$area_id", "tree_health_status": {"$first": "$tree_health_status"}}}
-    ])
+    mongo_data = mongo.db.api.aggregate(latest_tree_health_pipeline())
     df_mongo = pd.DataFrame(mongo_data)
     df_mongo.rename(columns={"_id": "area_id"}, inplace=True)
 
@@ -747,6 +1042,14 @@ def get_area_tree_health():
             'description': 'End date of the date range to filter the data (YYYY-MM-DD). Default is the current date.',
             'required': False
         },
+        {
+            'name': 'granularity',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['day', 'week', 'month', 'quarter', 'year'],
+            'description': 'Date bucket used to group the measurements. Default is month.',
+            'required': False
+        },
         {
             'name': 'uf',
             'in': 'query',
@@ -792,21 +1095,10 @@ def get_area_tree_health():
 @jwt_required()
 def get_tree_status():
     try:
-        filters = {}
         params = request.args
         area_id = params.get('area_id', default=None, type=int)
-        start_date = datetime.strptime(params.get('start_date', default='2000-01-01', type=str), "%Y-%m-%d")
-        end_date = datetime.strptime(params.get('end_date', default=datetime.now().strftime('%Y-%m-%d'), type=str), "%Y-%m-%d")
         uf = params.get('uf', default=None, type=str)
 
-        if area_id:
-            filters['area_id'] = int(area_id)
-
-        filters['measurement_date'] = {
-            "$gte": start_date,
-            "$lt": end_date
-        }
-
         sql_query = db.session.query(
             Area.id, Area.area_name
         ).join(Localization).filter(
@@ -814,30 +1106,10 @@ def get_tree_status():
             (Localization.uf == uf.upper()) if uf else True,
         ).all()
 
-        pipeline = [
-            {"$match": filters},
-            {
-                "$group": {
-                    "_id": {
-                        "measurement_date": {"$substr": ["$measurement_date", 0, 7]},
-                    },
-                    "area_id": {"$first": "$area_id"},
-                    "tree_health_status": {"$first": "$tree_health_status"}
-                }
-            },
-            {"$sort": {"_id.measurement_date": 1, "_id.fertilization": 1}},
-            {
-                "$project": {
-                    "_id": 0,
-                    "measurement_date": "$_id.measurement_date",
-                    "area_id": "$area_id",
-                    "tree_health_status": "$tree_health_status"
-                }
-            }
-        ]
+        collection, pipeline = tree_status_pipeline(params, area_id)
 
         df_pg = pd.DataFrame(sql_query)
-        df_mg = pd.DataFrame(list(mongo.db.api.aggregate(pipeline)))
+        df_mg = pd.DataFrame(list(collection.aggregate(pipeline)))
         df_merged = pd.merge(df_pg, df_mg, left_on='id', right_on='area_id', how='inner')
         df_merged.drop(columns=['area_id', 'id'], inplace=True)
 
@@ -880,6 +1152,14 @@ def get_tree_status():
             'description': 'End date of the date range to filter the data (YYYY-MM-DD). Default is the current date.',
             'required': False
         },
+        {
+            'name': 'granularity',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['day', 'week', 'month', 'quarter', 'year'],
+            'description': 'Date bucket used to group the measurements. Default is month.',
+            'required': False
+        },
         {
             'name': 'uf',
             'in': 'query',
@@ -926,21 +1206,10 @@ def get_tree_status():
 @jwt_required()
 def environmental_threats():
     try:
-        filters = {}
         params = request.args
         area_id = params.get('area_id', default=None, type=int)
-        start_date = datetime.strptime(params.get('start_date', default='2000-01-01', type=str), "%Y-%m-%d")
-        end_date = datetime.strptime(params.get('end_date', default=datetime.now().strftime('%Y-%m-%d'), type=str), "%Y-%m-%d")
         uf = params.get('uf', default=None, type=str)
 
-        if area_id:
-            filters['area_id'] = int(area_id)
-
-        filters['measurement_date'] = {
-            "$gte": start_date,
-            "$lt": end_date
-        }
-
         sql_query = db.session.query(
             Area.id, Area.area_name
         ).join(Localization).filter(
@@ -948,30 +1217,10 @@ def environmental_threats():
             (Localization.uf == uf.upper()) if uf else True,
         ).all()
 
-        pipeline = [
-            {"$match": filters},
-            {
-                "$group": {
-                    "_id": {
-                        "measurement_date": {"$substr": ["$measurement_date", 0, 7]},
-                        "area_id": "$area_id",
-                    },
-                    "environmental_threats": {"$first": "$environmental_threats"}
-                }
-            },
-            {"$sort": {"_id.measurement_date": 1, "_id.fertilization": 1}},
-            {
-                "$project": {
-                    "_id": 0,
-                    "measurement_date": "$_id.measurement_date",
-                    "area_id": "$_id.area_id",
-                    "environmental_threats": "$environmental_threats"
-                }
-            }
-        ]
+        collection, pipeline = environmental_threats_pipeline(params, area_id)
 
         df_pg = pd.DataFrame(sql_query)
-        df_mg = pd.DataFrame(list(mongo.db.api.aggregate(pipeline)))
+        df_mg = pd.DataFrame(list(collection.aggregate(pipeline)))
         df_merged = pd.merge(df_pg, df_mg, left_on='id', right_on='area_id', how='inner')
         df_merged.drop(columns=['area_id', 'id'], inplace=True)
 
@@ -991,6 +1240,31 @@ def environmental_threats():
     "summary": "Obter a média da taxa de sobrevivência de árvores por tipo de solo",
     "description": "Retorna a média da taxa de sobrevivência de árvores agrupada por tipo de solo, "
                    "com base nos dados armazenados no MongoDB.",
+    "parameters": [
+        {
+            "name": "uf",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Sigla do estado (UF) para filtrar as áreas."
+        },
+        {
+            "name": "start_date",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Data inicial para considerar medições (YYYY-MM-DD).",
+            "example": "2024-01-01"
+        },
+        {
+            "name": "end_date",
+            "in": "query",
+            "type": "string",
+            "required": False,
+            "description": "Data final (exclusiva) para considerar medições (YYYY-MM-DD).",
+            "example": "2025-01-01"
+        }
+    ],
     "responses": {
         200: {
             "description": "Média da taxa de sobrevivência por tipo de solo",
@@ -1009,32 +1283,45 @@ def environmental_threats():
         }
     }
 })
+@response_cache.cached
 def get_average_tree_survival():
-    areas = (
-        db.session.query(Area.area_name, Area.id, Localization.soil_type)
-        .join(Localization, Area.localization_id == Localization.id)
-        .all()
-    )
+    try:
+        params = request.args
+        uf = params.get("uf", type=str)
 
-    area_soil_map = {area.id: area.soil_type for area in areas} # {area_id: soil_type, ...}
-    mongo_data = mongo.db.api.find({}, {"area_id": 1, "tree_survival_rate": 1}) # {area_id: survival_rate, ...}
-    survival_rates = {} # {'arenoso': [52, 45, 32], 'pedregoso': [12, 20], ...}
-
-    for doc in mongo_data:
-        area_id = doc.get("area_id")
-        survival_rate = doc.get("tree_survival_rate")
-        if area_id:
-            soil_type = unidecode(area_soil_map[area_id]).lower()
-            rates_list = survival_rates.get(soil_type, [])
-            survival_rates[soil_type] = rates_list
-            rates_list.append(survival_rate)
-
-    averages = {
-        soil: sum(rates) / len(rates)
-        for soil, rates in survival_rates.items()
-    }
+        areas = (
+            db.session.query(Area.id, Localization.soil_type)
+            .join(Localization, Area.localization_id == Localization.id)
+            .filter((Localization.uf == uf.upper()) if uf else True)
+            .all()
+        )
+        area_soil_map = {area.id: _normalize_soil_type(area.soil_type) for area in areas if area.soil_type} # {area_id: 'arenoso', ...}
+
+        if not area_soil_map:
+            return jsonify({})
+
+        collection, pipeline = survival_by_area_pipeline(params, list(area_soil_map) if uf else None)
+        survival_by_area = collection.aggregate(pipeline)
+
+        survival_rates = {} # {'arenoso': [soma, quantidade], ...}
+        for doc in survival_by_area:
+            soil_type = area_soil_map.get(doc["_id"])
+            if soil_type is None or not doc["count"]:
+                continue
+            totals = survival_rates.setdefault(soil_type, [0, 0])
+            totals[0] += doc["sum"]
+            totals[1] += doc["count"]
+
+        averages = {
+            soil: total / count
+            for soil, (total, count) in survival_rates.items()
+        }
+
+        return jsonify(averages)
 
-    return jsonify(averages)
+    except (KeyError, ValueError) as error:
+        print(error)
+        abort(400, description=Messages.ERROR_INVALID_DATA('Area Information'))
 
 """
 [
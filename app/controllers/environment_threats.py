@@ -1,46 +1,15 @@
 from flask import Blueprint, abort, request, jsonify
 from flask_jwt_extended import jwt_required
-from collections import Counter
 from flasgger import swag_from
 
-from app.initializer import app, mongo
-from app.database import db
-from app.models import Area, Localization 
+from app.initializer import app
+from app.services.measurement_count_service import MeasurementCountService
+from app.util.utils import get_list_arg
 
 environment_threats = Blueprint(
     "environment_threats", __name__, url_prefix=app.config["API_URL_PREFIX"] + "/threats"
 )
 
-def get_area_names_by_uf(uf):
-    areas = (db.session
-            .query(Area.area_name)
-            .join(Localization)
-            .filter(Localization.uf == uf)
-            .with_entities(Area.area_name)
-            .all())
-    area_names = []
-    for area in areas:
-        area_name = area.area_name
-        area_uf = area_name.split('-')[1]
-        
-        if area_uf.upper() == uf: 
-            area_names.append(area_name)
-    
-    return area_names
-
-
-def get_threat_counts(area_names, threat_type=None):
-    if not area_names:
-        return {}
-
-    query = {"area_name": {"$in": area_names}}
-    if threat_type:
-        query["environmental_threats"] = threat_type
-    
-    areas_data = mongo.db.api.find(query)
-    threat_counts = Counter(area["environmental_threats"] for area in areas_data)
-    return threat_counts
-
 @environment_threats.route("/", methods=["GET"])
 @swag_from({
     'tags': ['Environment Threats'],
@@ -52,7 +21,15 @@ def get_threat_counts(area_names, threat_type=None):
             'in': 'query',
             'type': 'string',
             'required': True,
-            'description': 'The UF (state) to filter the areas by.'
+            'description': 'The UF (state) to filter the areas by. Several UFs can be sent comma separated (e.g. SP,RJ); '
+                           'the counts are then returned per UF.'
+        },
+        {
+            'name': 'threat_type',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Only count these threat types (comma separated).'
         }
     ],
     'responses': {
@@ -95,27 +72,33 @@ def get_threat_counts(area_names, threat_type=None):
     }
 })
 def get_threats():
-    uf = request.args.get("uf")
-    if not uf:
+    ufs = [uf.upper() for uf in get_list_arg(request.args, "uf")]
+    if not ufs:
         return jsonify({"error": "Parâmetro 'uf' é obrigatório"}), 400
 
-    area_names = get_area_names_by_uf(uf)
-    threat_counts = get_threat_counts(area_names)
+    threat_types = get_list_arg(request.args, "threat_type")
+    counts_by_uf = MeasurementCountService.count_by_uf("environmental_threats", ufs, threat_types)
+
+    if len(ufs) == 1:
+        return jsonify(counts_by_uf.get(ufs[0], {})), 200
 
-    return jsonify(threat_counts), 200
+    return jsonify(counts_by_uf), 200
 
 @environment_threats.route("/threats_by_state", methods=["GET"])
 @swag_from({
     'tags': ['Environment Threats'],
     'summary': 'Get environmental threats by state and type',
-    'description': 'Retrieve the count of a specific environmental threat by state (UF).',
+    'description': 'Retrieve the count of a specific environmental threat by state (UF), '
+                   'or of every threat type by state when threat_type is omitted.',
     'parameters': [
         {
             'name': 'threat_type',
             'in': 'query',
             'type': 'string',
-            'required': True,
-            'description': 'The type of environmental threat to filter by, e.g., "Invasões", "Incêndios", etc.'
+            'required': False,
+            'description': 'The type of environmental threat to filter by, e.g., "Invasões", "Incêndios", etc. '
+                           'Several types can be sent comma separated; the counts are then returned per type. '
+                           'Without threat_type the counts of all threat types by all states are returned.'
         }
     ],
     'responses': {
@@ -135,46 +118,39 @@ def get_threats():
                 }
             }
         },
-        400: {
-            'description': 'Invalid threat_type parameter provided.',
-            'schema': {
-                'type': 'object',
-                'properties': {
-                    'error': {'type': 'string', 'example': 'Parâmetro "threat_type" é obrigatório!'}
-                }
-            }
-        },
         404: {
-            'description': 'No data found for the provided threat type.',
+            'description': 'No threat found when every threat type is requested.',
             'schema': {
                 'type': 'object',
                 'properties': {
-                    'error': {'type': 'string', 'example': 'Nenhuma ameaça encontrada para este tipo.'}
+                    'error': {'type': 'string', 'example': 'Nenhuma ameaça encontrada.'}
                 }
             }
         }
     }
 })
 def count_threats_by_state():
-    threat_type = request.args.get("threat_type")
-    
-    if not threat_type:
-        return jsonify({"error": "Parâmetro 'threat_type' é obrigatório"}), 400
-     
-
-    areas = db.session.query(Area.area_name, Localization.uf).join(Localization).all()
-    area_to_uf = {area.area_name: area.uf for area in areas}
+    threat_types = get_list_arg(request.args, "threat_type")
 
-    query = {"environmental_threats": threat_type}
-    areas_data = mongo.db.api.find(query)
+    if not threat_types:
+        # Todos os tipos de ameaça por todas as UFs em uma única agregação
+        counts_by_uf = MeasurementCountService.count_by_uf(
+            "environmental_threats", hint="environmental_threats_area_id"
+        )
+        threat_types = sorted({threat_type for threat_counts in counts_by_uf.values() for threat_type in threat_counts})
+        if not threat_types:
+            return jsonify({"error": "Nenhuma ameaça encontrada."}), 404
+        single_type = False
+    else:
+        counts_by_uf = MeasurementCountService.count_by_uf("environmental_threats", values=threat_types)
+        single_type = len(threat_types) == 1
 
-    threat_counts_by_state = Counter()
-    
-    for area in areas_data:
-        area_name = area["area_name"]
-        uf = area_to_uf.get(area_name)
+    counts_by_threat = {threat_type: {} for threat_type in threat_types}
+    for uf, threat_counts in counts_by_uf.items():
+        for threat_type, count in threat_counts.items():
+            counts_by_threat[threat_type][uf] = count
 
-        if uf:
-            threat_counts_by_state[uf] += 1
+    if single_type:
+        return jsonify(counts_by_threat[threat_types[0]]), 200
 
-    return jsonify(threat_counts_by_state), 200
+    return jsonify(counts_by_threat), 200
@@ -1,13 +1,10 @@
-from datetime import datetime
-
 from flasgger import swag_from
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, url_for
 from sqlalchemy.exc import SQLAlchemyError
 from werkzeug.utils import secure_filename
-import pandas as pd
-from app.database import db
-from app.models import Area, Localization, Company
 from app.initializer import app, mongo
+from app.services.import_service import ImportService, InvalidImportFile, IMPORT_BATCH_SIZE
+from app.services.import_job_service import ImportJobService
 
 
 files = Blueprint("files", __name__, url_prefix=app.config["API_URL_PREFIX"] + "/import")
@@ -25,6 +22,13 @@ files = Blueprint("files", __name__, url_prefix=app.config["API_URL_PREFIX"] + "
             'type': 'file',
             'required': True,
             'description': 'CSV file containing data to import'
+        },
+        {
+            'name': 'async',
+            'in': 'query',
+            'type': 'boolean',
+            'required': False,
+            'description': 'Run the import in background and return a job id (202)'
         }
     ],
     'responses': {
@@ -51,65 +55,16 @@ def import_csv_sql():
     if not filename.endswith(".csv"):
         return jsonify({"error": "Invalid file format, only .csv allowed"}), 400
 
+    if _is_async():
+        return _enqueue("csv_sql", file)
+
     try:
-        df = pd.read_csv(file, decimal=",")
-        required_columns = [
-            "area_name", "number_of_trees_planted", "planting_techniques", "total_area_hectares",
-            "reflorested_area_hectares", "planted_species", "initial_planted_area_hectares",
-            "initial_vegetation_cover", "company_name", "cnpj", "uf", "city", "altitude", "soil_type"
-        ]
-
-        if not all(col in df.columns for col in required_columns):
-            return jsonify({"error": "Missing required columns in file"}), 400
-
-        areas = []
-
-        for _, row in df.iterrows():
-            localization = Localization.query.filter_by(
-                uf=row["uf"], city=row["city"]
-            ).first()
-
-            if not localization:
-                localization = Localization(
-                    uf=row["uf"],
-                    city=row["city"],
-                    altitude=float(row["altitude"]),
-                    soil_type=row["soil_type"]
-                )
-                db.session.add(localization)
-                db.session.flush()
-
-            company = Company.query.filter_by(cnpj=str(row["cnpj"])).first()
-
-            if not company:
-                company = Company(
-                    cnpj=str(row["cnpj"]),
-                    name=row["company_name"]
-                )
-                db.session.add(company)
-                db.session.flush()
-
-            area = Area(
-                area_name=row["area_name"],
-                number_of_trees_planted=int(row["number_of_trees_planted"]),
-                planting_techniques=row["planting_techniques"],
-                total_area_hectares=float(row["total_area_hectares"]),
-                reflorested_area_hectares=float(row["reflorested_area_hectares"]),
-                planted_species=row["planted_species"],
-                initial_planted_area_hectares=row["initial_planted_area_hectares"],
-                initial_vegetation_cover=row["initial_vegetation_cover"],
-                localization_id=localization.id,
-                company_id=company.id
-            )
-
-            areas.append(area)
-
-        db.session.bulk_save_objects(areas)
-        db.session.commit()
-        return jsonify({"message": "Data imported successfully"}), 201
+        stats = ImportService.import_areas(file)
+        return jsonify({"message": "Data imported successfully", **stats}), 201
 
+    except InvalidImportFile as e:
+        return jsonify({"error": str(e)}), 400
     except (ValueError, SQLAlchemyError) as e:
-        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 
@@ -125,6 +80,20 @@ def import_csv_sql():
             'type': 'file',
             'required': True,
             'description': 'CSV file containing data to import'
+        },
+        {
+            'name': 'batch_size',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Documents per insert_many batch (default IMPORT_BATCH_SIZE)'
+        },
+        {
+            'name': 'async',
+            'in': 'query',
+            'type': 'boolean',
+            'required': False,
+            'description': 'Run the import in background and return a job id (202)'
         }
     ],
     'responses': {
@@ -151,53 +120,19 @@ def import_csv_nosql():
     if not filename.endswith(".csv"):
         return jsonify({"error": "Invalid file format, only .csv allowed"}), 400
 
-    try:
-        df = pd.read_csv(file, decimal=",")
-
-        required_columns = [
-            "soil_fertility_index_percent", "area_code", "area_name",
-            "avoided_co2_emissions_cubic_meters", "number_of_trees_lost", "tree_health_status",
-            "average_tree_growth_cm", "water_sources", "water_quality_indicators",
-            "pest_management", "fertilization", "irrigation", "environmental_threats",
-            "total_project_cost_brl", "funding_source", "stage_indicator", "measurement_date",
-            "living_trees_to_date", "tree_survival_rate"
-        ]
-
-        missing_columns = [col for col in required_columns if col not in df.columns]
-
-        if missing_columns:
-            return jsonify({"error": f"Missing required columns in file - missing_columns: {missing_columns}"}), 400
-
-        for _, row in df.iterrows():
-            area = Area.query.filter_by(area_name=row["area_name"]).first()
-            if area is not None:
-                area_measurements = {
-                    "area_id": area.id,
-                    "soil_fertility_index_percent": row["soil_fertility_index_percent"],
-                    "area_code": row["area_code"],
-                    "area_name": row["area_name"],
-                    "avoided_co2_emissions_cubic_meters": float(row["avoided_co2_emissions_cubic_meters"]),
-                    "number_of_trees_lost": int(row["number_of_trees_lost"]),
-                    "tree_health_status": row["tree_health_status"],
-                    "average_tree_growth_cm": float(row["average_tree_growth_cm"]),
-                    "water_sources": row["water_sources"],
-                    "water_quality_indicators": row["water_quality_indicators"],
-                    "pest_management": row["pest_management"],
-                    "fertilization": row["fertilization"],
-                    "irrigation": row["irrigation"],
-                    "environmental_threats": row["environmental_threats"],
-                    "total_project_cost_brl": float(row["total_project_cost_brl"]),
-                    "funding_source": row["funding_source"],
-                    "stage_indicator": row["stage_indicator"],
-                    "measurement_date": datetime.strptime(row["measurement_date"], "%Y-%m-%d"),
-                    "living_trees_to_date": int(row["living_trees_to_date"]),
-                    "tree_survival_rate": float(row["tree_survival_rate"]),
-                }
+    batch_size = request.args.get("batch_size", default=IMPORT_BATCH_SIZE, type=int)
+    if batch_size <= 0:
+        return jsonify({"error": "batch_size must be a positive integer"}), 400
 
-                mongo.db.api.insert_one(area_measurements)
+    if _is_async():
+        return _enqueue("csv_nosql", file, batch_size=batch_size)
 
-        return jsonify({"message": "Data imported successfully"}), 201
+    try:
+        stats = ImportService.import_measurements(file, batch_size=batch_size)
+        return jsonify({"message": "Data imported successfully", **stats}), 201
 
+    except InvalidImportFile as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -214,6 +149,20 @@ def import_csv_nosql():
             'type': 'file',
             'required': True,
             'description': 'CSV file containing data to import'
+        },
+        {
+            'name': 'batch_size',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Rows read and inserted per chunk (default IMPORT_BATCH_SIZE)'
+        },
+        {
+            'name': 'async',
+            'in': 'query',
+            'type': 'boolean',
+            'required': False,
+            'description': 'Run the import in background and return a job id (202)'
         }
     ],
     'responses': {
@@ -231,7 +180,7 @@ def import_csv_nosql():
 def import_cities_coordinates():
     file = request.files.get('file.csv')
     collection = mongo.db.api_cities_coordinates
-    return _import_mongo_data(collection, file)
+    return _import_mongo_data("cities_coordinates", collection, file)
 
 
 
@@ -246,6 +195,20 @@ def import_cities_coordinates():
             'type': 'file',
             'required': True,
             'description': 'CSV file containing data to import'
+        },
+        {
+            'name': 'batch_size',
+            'in': 'query',
+            'type': 'integer',
+            'required': False,
+            'description': 'Rows read and inserted per chunk (default IMPORT_BATCH_SIZE)'
+        },
+        {
+            'name': 'async',
+            'in': 'query',
+            'type': 'boolean',
+            'required': False,
+            'description': 'Run the import in background and return a job id (202)'
         }
     ],
     'responses': {
@@ -263,10 +226,10 @@ def import_cities_coordinates():
 def import_inmet_data():
     file = request.files.get('file.csv')
     collection = mongo.db.api_inmet
-    return _import_mongo_data(collection, file)
+    return _import_mongo_data("inmet", collection, file)
 
 
-def _import_mongo_data(collection, file):
+def _import_mongo_data(kind, collection, file):
     if not file:
         return jsonify({"error": "No file part"}), 400
 
@@ -277,12 +240,70 @@ def _import_mongo_data(collection, file):
     if not filename.endswith(".csv"):
         return jsonify({"error": "Invalid file format, only .csv allowed"}), 400
 
-    try:
-        df = pd.read_csv(file, decimal=",")
+    chunk_size = request.args.get("batch_size", default=IMPORT_BATCH_SIZE, type=int)
+    if chunk_size <= 0:
+        return jsonify({"error": "batch_size must be a positive integer"}), 400
 
-        collection.insert_many(df.to_dict(orient="records"))
+    if _is_async():
+        return _enqueue(kind, file, chunk_size=chunk_size)
 
-        return jsonify({"message": "Data imported successfully"}), 201
+    try:
+        stats = ImportService.import_collection(collection, file, chunk_size=chunk_size)
+        return jsonify({"message": "Data imported successfully", **stats}), 201
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 50
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+@files.route("/jobs/<job_id>", methods=["GET"])
+@swag_from({
+    'tags': ['Import CSV'],
+    'summary': 'Import job status',
+    'description': 'Returns the state, processed rows, errors and throughput of a background import job.',
+    'parameters': [
+        {
+            'name': 'job_id',
+            'in': 'path',
+            'type': 'string',
+            'required': True,
+            'description': 'Job id returned by an import endpoint called with async=true'
+        }
+    ],
+    'responses': {
+        '200': {
+            'description': 'Job status',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'id': '3f2c9d0e5b8a4c1e9f7d6b5a4c3e2f1a',
+                        'kind': 'inmet',
+                        'state': 'running',
+                        'rows_processed': 120000,
+                        'errors': [],
+                        'rows_per_second': 41250.5
+                    }
+                }
+            }
+        },
+        '404': {
+            'description': 'Job not found',
+        }
+    }
+})
+def get_import_job(job_id):
+    job = ImportJobService.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
+def _is_async():
+    return request.args.get("async", "").lower() in ("1", "true", "yes")
+
+
+def _enqueue(kind, file, **options):
+    job_id = ImportJobService.submit(kind, file, **options)
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for("files.get_import_job", job_id=job_id)
+    }), 202
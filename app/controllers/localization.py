@@ -6,6 +6,7 @@ from app.initializer import app
 from app.database import db
 from app.models import Localization
 from app.schemas import LocalizationSchema
+from app.services.response_cache_service import response_cache
 
 localizations = Blueprint(
     "localizations",
@@ -39,6 +40,7 @@ def post():
         setattr(new_company, field, data[field])
     db.session.add(new_company)
     db.session.commit()
+    response_cache.bump()
     return {"msg": "ok"}
 
 
@@ -51,6 +53,7 @@ def delete(id):
 
     db.session.delete(localization)
     db.session.commit()
+    response_cache.bump()
 
     return {"message": "Localization deleted successfully"}, 200
 
@@ -71,6 +74,7 @@ def update(id):
             data, instance=localization, partial=True
         )
         db.session.commit()
+        response_cache.bump()
         return LocalizationSchema().dump(updated_localization), 200
     except ValidationError as err:
         return {"errors": err.messages}, 400
@@ -1,12 +1,20 @@
 from flask import Blueprint, abort, request
-from flask_jwt_extended import jwt_required
-import joblib
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from flasgger import swag_from
+from werkzeug.exceptions import HTTPException
+import os
 import pandas as pd
 from datetime import datetime
-from mlxtend.frequent_patterns import apriori, association_rules
 
-from app.initializer import app, mongo
+from app.initializer import app
 from app.database import db
+from app.services.association_rules_service import AssociationRulesService
+from app.models.user import User, CargoEnum
+from app.services.feature_encoder_service import (
+    CATEGORICAL_FEATURES, UnknownCategoryError, UNKNOWN_ERROR, UNKNOWN_IGNORE
+)
+from app.services.measurement_count_service import MeasurementCountService
+from app.services.model_registry_service import model_registry
 
 machine_learning = Blueprint(
     "machine_learning",
@@ -14,116 +22,298 @@ machine_learning = Blueprint(
     url_prefix=app.config["API_URL_PREFIX"] + "/machine_learning",
 )
 
-MODEL = joblib.load('model_v2.pkl')
-SCALER = joblib.load('scaler_v2.pkl')
-COLUMNS_USED = joblib.load('columns_used.pkl')
+# Limite de registros por chamada do endpoint de predição em lote
+BATCH_PREDICT_MAX_ROWS = int(os.getenv('BATCH_PREDICT_MAX_ROWS', 10000))
+
+
+def _unknown_policy():
+    unknown = request.args.get('unknown', UNKNOWN_IGNORE)
+    if unknown not in (UNKNOWN_IGNORE, UNKNOWN_ERROR):
+        raise KeyError('unknown')
+    return unknown
+
+
+def _class_scores(model, input_scaled):
+    """
+    Probabilidades por classe quando o modelo as suporta; caso contrário, os
+    valores de decision_function. Retorna (chave da resposta, lista de {classe: valor}).
+    """
+    if hasattr(model, 'predict_proba'):
+        key, values = 'probabilities', model.predict_proba(input_scaled)
+    else:
+        key, values = 'scores', model.decision_function(input_scaled)
+
+    classes = [str(label) for label in model.classes_]
+    return key, [
+        {label: round(float(value), 6) for label, value in zip(classes, row)}
+        for row in values
+    ]
 
 @machine_learning.route("/predict-tree-health", methods=["POST"])
 # @jwt_required()
 def predict_tree_health():
     try:
         data = request.get_json()
+        artifacts = model_registry.get()
 
-        input_data = {
-            'number_of_trees_lost': data.get('number_of_trees_lost', 0),
-            'avoided_co2_emissions_cubic_meters': data.get('avoided_co2_emissions_cubic_meters', 0),
-            'average_tree_growth_cm': data.get('average_tree_growth_cm', 0),
-            'water_sources': data['water_sources'],
-            'pest_management': data['pest_management'],
-            'fertilization': data['fertilization'],
-            'irrigation': data['irrigation'],
-            'environmental_threats': data['environmental_threats'],
-            'total_project_cost_brl': data.get('total_project_cost_brl', 0),
-            'stage_indicator': data['stage_indicator'],
-            'living_trees_to_date': data.get('living_trees_to_date', 0),
-            'soil_fertility_index_percent': data.get('soil_fertility_index_percent', 0),
-            'water_quality_indicators': data['water_quality_indicators']
-        }
-        df = pd.DataFrame([input_data])
-        df_encoded = pd.get_dummies(df, columns=[
-            'water_sources', 
-            'pest_management', 
-            'fertilization', 
-            'irrigation', 
-            'environmental_threats',
-            'stage_indicator',
-            'water_quality_indicators'
-        ])
-        for col in COLUMNS_USED:
-            if col not in df_encoded.columns:
-                df_encoded[col] = 0
-
-        df_encoded = df_encoded[COLUMNS_USED]
-        input_scaled = SCALER.transform(df_encoded)
-        prediction = MODEL.predict(input_scaled)
+        input_encoded = artifacts.encoder.encode_record(data, unknown=_unknown_policy())
+        input_scaled = artifacts.scale(input_encoded)
+        prediction = artifacts.model.predict(input_scaled)
         return {'prediction': prediction[0]}
 
     except KeyError as e:
         return abort(400, description=f"Missing parameter: {str(e)}")
+    except UnknownCategoryError as e:
+        return abort(400, description=str(e))
     except Exception as e:
         return abort(500, description=f"error: {str(e)}")
-    
+
+
+@machine_learning.route("/predict-tree-health/batch", methods=["POST"])
+# @jwt_required()
+@swag_from({
+    'tags': ['Machine Learning'],
+    'summary': 'Predict tree health for many records',
+    'description': 'Accepts a JSON array of records (same fields as /predict-tree-health) or a CSV upload '
+                   '(form field "file.csv"). All records are encoded, scaled and predicted in one pass; '
+                   'predictions are returned in input order.',
+    'parameters': [
+        {
+            'name': 'probabilities',
+            'in': 'query',
+            'type': 'boolean',
+            'required': False,
+            'description': 'Also return per-class probabilities (or decision scores when the model '
+                           'was trained without probability estimates).'
+        },
+        {
+            'name': 'unknown',
+            'in': 'query',
+            'type': 'string',
+            'enum': ['ignore', 'error'],
+            'required': False,
+            'description': 'Categories unknown to the model: "ignore" (default) leaves their one-hot columns '
+                           'at zero, "error" rejects the request with 400.'
+        },
+        {
+            'name': 'decimal',
+            'in': 'query',
+            'type': 'string',
+            'required': False,
+            'description': 'Decimal separator of the CSV upload. Default is ",".'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Predictions in input order',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'count': 2,
+                        'predictions': ['Saudáveis', 'Com Pragas'],
+                        'scores': [
+                            {'Com Pragas': 0.81, 'Morrendo': -0.23, 'Saudáveis': 2.25},
+                            {'Com Pragas': 2.19, 'Morrendo': 0.87, 'Saudáveis': -0.21}
+                        ]
+                    }
+                }
+            }
+        },
+        400: {'description': 'Missing fields, empty input or too many records'}
+    }
+})
+def predict_tree_health_batch():
+    try:
+        file = request.files.get('file.csv')
+        if file:
+            df = pd.read_csv(file, decimal=request.args.get('decimal', ','))
+        else:
+            data = request.get_json(silent=True)
+            if not isinstance(data, list):
+                return abort(400, description="Expected a JSON array of records or a CSV file")
+            df = pd.DataFrame.from_records(data)
+
+        if df.empty:
+            return abort(400, description="No records provided")
+        if len(df) > BATCH_PREDICT_MAX_ROWS:
+            return abort(400, description=f"Too many records: {len(df)} (max {BATCH_PREDICT_MAX_ROWS})")
+
+        artifacts = model_registry.get()
+        input_scaled = artifacts.scale(artifacts.encoder.encode_frame(df, unknown=_unknown_policy()))
+        result = {
+            'count': len(df),
+            'model_version': artifacts.version,
+            'predictions': [str(label) for label in artifacts.model.predict(input_scaled)]
+        }
+
+        if request.args.get('probabilities', 'false').lower() == 'true':
+            key, values = _class_scores(artifacts.model, input_scaled)
+            result[key] = values
+
+        return result
+
+    except KeyError as e:
+        return abort(400, description=f"Missing parameter: {str(e)}")
+    except (ValueError, pd.errors.ParserError) as e:  # inclui UnknownCategoryError
+        return abort(400, description=f"Invalid data: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        return abort(500, description=f"error: {str(e)}")
+
+
+@machine_learning.route("/model", methods=["GET"])
+@jwt_required()
+@swag_from({
+    'tags': ['Machine Learning'],
+    'summary': 'Tree-health model registry status',
+    'description': 'Returns the active model version and its artifacts. The model is loaded lazily on first use, '
+                   'so "loaded" is false until the first prediction.',
+    'responses': {
+        200: {
+            'description': 'Registry status',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'loaded': True,
+                        'default_version': 'v2',
+                        'mmap': True,
+                        'active': {
+                            'version': 'v2',
+                            'model_type': 'SVC',
+                            'classes': ['Com Pragas', 'Morrendo', 'Saudáveis'],
+                            'n_features': 30,
+                            'paths': {'model': './model_v2.pkl', 'scaler': './scaler_v2.pkl',
+                                      'columns': './columns_used.pkl'},
+                            'load_ms': 104.2,
+                            'loaded_on': '2025-05-01T10:00:00'
+                        }
+                    }
+                }
+            }
+        }
+    }
+})
+def get_model_info():
+    return model_registry.info(), 200
+
+
+@machine_learning.route("/model/reload", methods=["POST"])
+@jwt_required()
+@swag_from({
+    'tags': ['Machine Learning'],
+    'summary': 'Hot swap the tree-health model',
+    'description': 'Loads model_<version>.pkl, scaler_<version>.pkl and columns_used_<version>.pkl (or columns_used.pkl) '
+                   'from ML_MODEL_DIR and makes them active without a restart. Requests in flight finish with the '
+                   'previous version; other workers follow within ML_MODEL_VERSION_CHECK_SECONDS. Admin only.',
+    'parameters': [
+        {
+            'name': 'body',
+            'in': 'body',
+            'required': True,
+            'schema': {
+                'type': 'object',
+                'properties': {'version': {'type': 'string', 'example': 'v3'}}
+            }
+        }
+    ],
+    'responses': {
+        200: {'description': 'New version active'},
+        400: {'description': 'Invalid version or artifacts that do not match each other'},
+        403: {'description': 'User is not an admin'},
+        404: {'description': 'Artifacts of the version not found'}
+    }
+})
+def reload_model():
+    user = User.query.get(get_jwt_identity())
+    if not user or user.cargo != CargoEnum.ADMIN:
+        return abort(403, description="Only admins can reload the model")
+
+    data = request.get_json(silent=True) or {}
+    version = data.get('version') or model_registry.default_version
+
+    try:
+        artifacts, previous_version = model_registry.swap(version)
+    except FileNotFoundError as e:
+        return abort(404, description=str(e))
+    except ValueError as e:
+        return abort(400, description=str(e))
+
+    return {'previous_version': previous_version, 'active': artifacts.to_dict()}, 200
+
 
 @machine_learning.route("/association-rules", methods=["GET"])
 # @jwt_required()
 def generate_association_rules():
     try:
-        area_info = list(mongo.db.api.find({}))
-        
-        if not area_info:
-            return abort(404, description="No data found")
+        result = AssociationRulesService.latest()
 
-        df = pd.DataFrame(area_info)
-        df['high_survival'] = df['tree_survival_rate'] > 70
-        high_survival_practices = df[df['high_survival']][
-            ['water_sources', 'pest_management', 'fertilization', 'irrigation', 'environmental_threats']
-        ]
-        practices_dummies = pd.get_dummies(high_survival_practices)
-
-        frequent_itemsets = apriori(practices_dummies, min_support=0.05, use_colnames=True)
-        rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=0.5)
-
-        def split_feature(feature):
-            parts = feature.split('_')
-            col_name = '_'.join(parts[:-1])
-            value = parts[-1]
-            return col_name, value
-        
-        formatted_rules = []
-        for _, rule in rules.iterrows():
-            conseq_item = list(rule['consequents'])[0]
-            conseq_col, conseq_value = split_feature(conseq_item)
-            formatted_rule = {
-                "antecedents": list(rule['antecedents'])[0].split('_', 1)[1],
-                "confidence": rule['confidence'],
-                "consequents": {
-                    conseq_col: conseq_value
-                },
-                "lift": rule['lift'],
-                "support": rule['support']
-            }
-            formatted_rules.append(formatted_rule)
+        if result is None:
+            AssociationRulesService.schedule_refresh()
+            return {"status": "pending", "message": "Association rules are being mined, try again shortly"}, 202
+
+        if AssociationRulesService.is_stale(result):
+            AssociationRulesService.schedule_refresh()
 
-        return formatted_rules
+        if not result["measurement_count"]:
+            return abort(404, description="No data found")
 
+        return result["rules"], 200, {
+            "X-Rules-Mined-On": result["mined_on"].isoformat(),
+            "X-Rules-Measurement-Count": str(result["measurement_count"])
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
         return abort(500, description=f"error: {str(e)}")
 
 @machine_learning.route("/list", methods=["GET"])
-def get_valores_unicos():
-    collection = mongo.db.api
-    return {
-        # 'number_of_trees_lost': collection.distinct('number_of_trees_lost'),
-        # 'avoided_co2_emissions_cubic_meters': collection.distinct('avoided_co2_emissions_cubic_meters'),
-        # 'average_tree_growth_cm': collection.distinct('average_tree_growth_cm'),
-        'water_sources': collection.distinct('water_sources'),
-        'pest_management': collection.distinct('pest_management'),
-        'fertilization': collection.distinct('fertilization'),
-        'irrigation': collection.distinct('irrigation'),
-        'environmental_threats': collection.distinct('environmental_threats'),
-        # 'total_project_cost_brl': collection.distinct('total_project_cost_brl'),
-        'stage_indicator': collection.distinct('stage_indicator'),
-        # 'living_trees_to_date': collection.distinct('living_trees_to_date'),
-        # 'soil_fertility_index_percent': collection.distinct('soil_fertility_index_percent'),
-        'water_quality_indicators': collection.distinct('water_quality_indicators')
+@swag_from({
+    'tags': ['Machine Learning'],
+    'summary': 'Categorical domains of the measurements',
+    'description': 'Distinct values of each categorical field used by the tree-health model, computed in one '
+                   'aggregation and cached until the next import. With layout=true the one-hot column layout of '
+                   'the active model is also returned, so clients can validate input before calling predict.',
+    'parameters': [
+        {
+            'name': 'layout',
+            'in': 'query',
+            'type': 'boolean',
+            'required': False,
+            'description': 'Include the model column layout under "layout".'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Distinct values per field',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'water_sources': ['Lago', 'Nascente', 'Nenhuma', 'Rio'],
+                        'pest_management': ['Não', 'Sim'],
+                        'layout': {
+                            'model_version': 'v2',
+                            'columns': ['number_of_trees_lost', '...', 'water_quality_indicators_Ruim'],
+                            'numeric': ['number_of_trees_lost', '...'],
+                            'categorical': {'water_sources': ['Lago', 'Nascente', 'Nenhuma', 'Rio']}
+                        }
+                    }
+                }
+            }
+        }
     }
+})
+def get_valores_unicos():
+    result = dict(MeasurementCountService.domains(CATEGORICAL_FEATURES))
+
+    if request.args.get('layout', 'false').lower() == 'true':
+        artifacts = model_registry.get()
+        result['layout'] = {
+            'model_version': artifacts.version,
+            'columns': artifacts.columns,
+            'numeric': list(artifacts.encoder.numeric_index),
+            'categorical': artifacts.encoder.categories()
+        }
+
+    return result
@@ -1,43 +1,16 @@
 from flask import Blueprint, abort, request, jsonify
 from flask_jwt_extended import jwt_required
-from collections import Counter
 from flasgger import swag_from
 
-from app.initializer import app, mongo
-from app.database import db
-from app.models import Area, Localization 
-from app.schemas import AreaSchema
+from app.initializer import app
+from app.services.measurement_count_service import MeasurementCountService
+from app.util.utils import get_list_arg
 
 
 reforestation = Blueprint(
     "reforestation", __name__, url_prefix=app.config["API_URL_PREFIX"] + "/reforestation"
 )
 
-def get_area_names_by_uf(uf):
-    areas = (db.session
-            .query(Area.area_name)
-            .join(Localization)
-            .filter(Localization.uf == uf)
-            .with_entities(Area.area_name)
-            .all())
-    area_names = []
-    for area in areas:
-        area_name = area.area_name
-        area_uf = area_name.split('-')[1]  
-        
-        if area_uf.upper() == uf: 
-            area_names.append(area_name)
-    
-    return area_names
-
-
-def get_stage_counts(area_names):
-    if not area_names:
-        return {}
-    areas_data = mongo.db.api.find({"area_name": {"$in": area_names}})
-    stage_counts = Counter(area["stage_indicator"] for area in areas_data)
-    return stage_counts
-
 @reforestation.route("/stages", methods=["GET"])
 #@jwt_required()
 @swag_from({
@@ -50,7 +23,7 @@ def get_stage_counts(area_names):
             'in': 'query',
             'type': 'string',
             'required': True,
-            'description': 'The UF (state) to filter the areas by.'
+            'description': 'The UF (state) to filter the areas by. Several UFs can be sent comma separated (e.g. RJ,SP).'
         }
     ],
     'responses': {
@@ -69,6 +42,10 @@ def get_stage_counts(area_names):
                             'Iniciado': {'type': 'integer', 'example': 1060},
                             'Área Reflorestada': {'type': 'integer', 'example': 1437}
                         }
+                    },
+                    'stage_counts_by_uf': {
+                        'type': 'object',
+                        'description': 'Only when more than one UF is requested: stage counts per UF.'
                     }
                 }
             }
@@ -94,20 +71,26 @@ def get_stage_counts(area_names):
     }
 })
 def get_reforestation_stages():
-    uf = request.args.get("uf", "").strip().upper()
+    ufs = [uf.upper() for uf in get_list_arg(request.args, "uf")]
 
-
-    if not uf:
+    if not ufs:
         return jsonify({"error": "UF é obrigatória!"}), 400
-    
-    area_names = get_area_names_by_uf(uf)
 
-    if not area_names:
+    area_ufs = MeasurementCountService.area_uf_map(ufs)
+    if not area_ufs:
         return jsonify({"error": "Nenhuma área encontrada para esta UF."}), 404
 
-    stage_counts = get_stage_counts(area_names)
+    counts_by_uf = MeasurementCountService.count_by_uf("stage_indicator", ufs, area_ufs=area_ufs)
 
-    if not stage_counts:
+    if not counts_by_uf:
         return jsonify({"error": "Nenhum estágio encontrado para as áreas da UF."}), 404
 
-    return jsonify({"uf": uf, "stage_counts": stage_counts})
+    if len(ufs) == 1:
+        return jsonify({"uf": ufs[0], "stage_counts": counts_by_uf.get(ufs[0], {})})
+
+    stage_counts = {}
+    for uf_counts in counts_by_uf.values():
+        for stage, count in uf_counts.items():
+            stage_counts[stage] = stage_counts.get(stage, 0) + count
+
+    return jsonify({"uf": ufs, "stage_counts": stage_counts, "stage_counts_by_uf": counts_by_uf})
@@ -1,105 +1,253 @@
-import os
-import base64
-import pandas as pd
-from sqlalchemy import func
 from flasgger import swag_from
-from flask import Blueprint, abort, send_file
-from flask_jwt_extended import jwt_required, get_jwt
+from flask import Blueprint, abort, make_response, request, send_file, url_for
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from werkzeug.exceptions import HTTPException
 
-from app.database import db
-from app.util.pdf import MarkdownToPDF
 from app.util.messages import Messages
-from app.initializer import app, mongo#, chat
-from app.util.graph_builder import GraphBuilder
-from app.models import Area, Company, Localization
-from app.util.report_messages import graph_analysis
+from app.initializer import app#, chat
+from app.util.report_render import render_report_pdf
+from app.services.report_service import ReportService, report_store
+from app.services.report_job_service import ReportJobService
 
 report = Blueprint("report", __name__, url_prefix=app.config["API_URL_PREFIX"] + "/report")
 
 @report.route("/<int:area_id>", methods=["GET"])
 @jwt_required()
+@swag_from({
+    'tags': ['Report'],
+    'summary': 'Get the PDF report of an area',
+    'description': 'The PDF is cached per area and data version (latest measurement, number of measurements, '
+                   'area update time and template version). The ETag identifies that version; send it back in '
+                   'If-None-Match to get a 304 when nothing changed.',
+    'parameters': [
+        {
+            'name': 'area_id',
+            'in': 'path',
+            'required': True,
+            'schema': {'type': 'integer'},
+            'description': 'The ID of the area'
+        },
+        {
+            'name': 'If-None-Match',
+            'in': 'header',
+            'required': False,
+            'schema': {'type': 'string'},
+            'description': 'ETag of a previously downloaded report'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'The report PDF (X-Cache: HIT when served from the report cache)',
+            'content': {'application/pdf': {}}
+        },
+        304: {
+            'description': 'The report did not change since the given ETag'
+        },
+        404: {
+            'description': Messages.ERROR_NOT_FOUND('Area')
+        },
+        500: {
+            'description': Messages.UNKNOWN_ERROR('Report')
+        }
+    }
+})
 def get_report(area_id):
     try:
-        pdf = MarkdownToPDF()
-        columns = [
-            "area_name",
-            # "uf",
-            # "city",
-            "planting_techniques",
-            "planted_species",
-            "total_area_hectares",
-            "initial_planted_area_hectares",
-            "initial_vegetation_cover",
-            "soil_fertility_index_percent",
-            "avoided_co2_emissions_cubic_meters",
-            "number_of_trees_lost",
-            "tree_health_status",
-            "average_tree_growth_cm",
-            "water_sources",
-            "water_quality_indicators",
-            "pest_management",
-            "fertilization",
-            "irrigation",
-            "environmental_threats",
-            # "total_project_cost_brl",
-            # "funding_source",
-            "stage_indicator",
-            "measurement_date",
-            "living_trees_to_date",
-            "tree_survival_rate"
-        ]
-
-        sql_query = db.session.query(
-            (Area.id).label('areaid'), Area.area_name, Area.planting_techniques, Area.planted_species, 
-            Area.total_area_hectares, Area.initial_planted_area_hectares, Area.initial_vegetation_cover,
-            Localization.uf, Localization.city
-        ).join(Localization).filter(
-            Area.id == area_id
-        ).all()
-
-        df_pg = pd.DataFrame(sql_query)
-        area_list = df_pg['areaid'].to_list()
-
-        pipeline = [
-            {"$match": {"area_id": {"$in": area_list}}},
-            {
-                "$project": {
-                    "_id": 0,
-                    "area_name": 0,
+        fingerprint = ReportService.fingerprint(area_id)
+        if fingerprint is None:
+            return abort(404, description=Messages.ERROR_NOT_FOUND('Area'))
+
+        # O PDF é determinado pelo fingerprint: se o cliente já tem essa versão, não precisa baixar de novo
+        if fingerprint in request.if_none_match:
+            response = make_response('', 304)
+            response.set_etag(fingerprint)
+            return response
+
+        name = ReportService.cache_name(area_id, fingerprint)
+        path = report_store.get(name)
+        cache_status = 'HIT'
+        if path is None:
+            data = ReportService.load_data(area_id)
+            if not data:
+                return abort(404, description=Messages.ERROR_NOT_FOUND('Area'))
+
+            # message = f"dados: A seguinte lista de dados deve ser usada para gerar os relatórios:\n{data}"
+            # pdf.add_page(chat.send_message(message))
+
+            path = render_report_pdf(data, report_store.path_for(name))
+            ReportService.evict(keep=name)
+            cache_status = 'MISS'
+
+        response = send_file(
+            path, download_name='relatorio.pdf', mimetype='application/pdf', as_attachment=True,
+            etag=fingerprint, conditional=True
+        )
+        response.cache_control.private = True
+        response.headers['X-Cache'] = cache_status
+        return response
+    except HTTPException:
+        raise
+    except Exception as error:
+        print('ERRO: ', error)
+        abort(500, description=Messages.UNKNOWN_ERROR('Report'))
+
+
+@report.route("/<int:area_id>/jobs", methods=["POST"])
+@jwt_required()
+@swag_from({
+    'tags': ['Report'],
+    'summary': 'Queue the PDF report of an area',
+    'description': 'Loads the area data and renders the report in the background. '
+                   'Poll the status URL and fetch the PDF from the download URL when the job is done. '
+                   'If the report for the current data version is already cached, the job is created as done.',
+    'parameters': [
+        {
+            'name': 'area_id',
+            'in': 'path',
+            'required': True,
+            'schema': {'type': 'integer'},
+            'description': 'The ID of the area'
+        }
+    ],
+    'responses': {
+        202: {
+            'description': 'Report job queued (or already done when the report was cached)',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'job_id': '3f2b9c1e8a7d4e6f9b0c1d2e3f4a5b6c',
+                        'state': 'queued',
+                        'status_url': '/api/report/jobs/3f2b9c1e8a7d4e6f9b0c1d2e3f4a5b6c',
+                        'download_url': '/api/report/jobs/3f2b9c1e8a7d4e6f9b0c1d2e3f4a5b6c/download'
+                    }
                 }
             }
-        ]
-
-        df_mg = pd.DataFrame(list(mongo.db.api.aggregate(pipeline)))
-        df_merged = pd.merge(df_pg, df_mg, left_on='areaid', right_on='area_id', how='inner')
-        df_merged.drop(columns=['area_id', 'areaid'], inplace=True)
-        df_merged = df_merged[columns]
-        df_merged["measurement_date"] = pd.to_datetime(df_merged["measurement_date"]).dt.strftime("%Y-%m-%d")
-
-        graph = GraphBuilder()
-        temp_file_path = os.getenv('TEMPORARY_FOLDER_PATH')
-        path_image_1 = f'{temp_file_path}/image/image_1.png'
-        path_image_2 = f'{temp_file_path}/image/image_2.png'
-        data = df_merged.to_dict(orient='records')
-        graph.plot_trend_analysis(data, path_image_1)
-        graph.plot_area_evolution(data, path_image_2)
-
-        message = f"dados: A seguinte lista de dados deve ser usada para gerar os relatórios:\n{df_merged.to_dict(orient='records')}"
-        # pdf.add_page(chat.send_message(message))
-        
-        with open(path_image_1, 'rb') as f:
-            encoded = base64.b64encode(f.read()).decode('utf-8')
-            base64_image_1 = f"data:image/png;base64,{encoded}"
-        with open(path_image_2, 'rb') as f:
-            encoded = base64.b64encode(f.read()).decode('utf-8')
-            base64_image_2 =  f"data:image/png;base64,{encoded}"
-
-        graph_analysis_formatted= graph_analysis.replace('<<path_image_1>>', base64_image_1)
-        graph_analysis_formatted = graph_analysis_formatted.replace('<<path_image_2>>', base64_image_2)
-        pdf.add_page(graph_analysis_formatted)
-        pdf.save()
-
-        return send_file(pdf.get_path(), download_name='relatorio.pdf', mimetype='application/pdf', as_attachment=True)
+        },
+        404: {
+            'description': Messages.ERROR_NOT_FOUND('Area')
+        },
+        500: {
+            'description': Messages.UNKNOWN_ERROR('Report')
+        }
+    }
+})
+def create_report_job(area_id):
+    try:
+        fingerprint = ReportService.fingerprint(area_id)
+        if fingerprint is None:
+            return abort(404, description=Messages.ERROR_NOT_FOUND('Area'))
+
+        company_id, user_id = get_jwt().get('company_id'), get_jwt_identity()
+        name = ReportService.cache_name(area_id, fingerprint)
+        job_id = ReportJobService.submit_cached(area_id, name, company_id, user_id)
+        state = "done"
+        if job_id is None:
+            data = ReportService.load_data(area_id)
+            if not data:
+                return abort(404, description=Messages.ERROR_NOT_FOUND('Area'))
+
+            job_id = ReportJobService.submit(area_id, name, data, company_id, user_id)
+            state = "queued"
+
+        return {
+            "job_id": job_id,
+            "state": state,
+            "status_url": url_for('report.get_report_job', job_id=job_id),
+            "download_url": url_for('report.download_report_job', job_id=job_id)
+        }, 202
+    except HTTPException:
+        raise
     except Exception as error:
         print('ERRO: ', error)
         abort(500, description=Messages.UNKNOWN_ERROR('Report'))
+
+
+@report.route("/jobs/<job_id>", methods=["GET"])
+@jwt_required()
+@swag_from({
+    'tags': ['Report'],
+    'summary': 'Get the status of a report job',
+    'parameters': [
+        {
+            'name': 'job_id',
+            'in': 'path',
+            'required': True,
+            'schema': {'type': 'string'},
+            'description': 'The ID returned when the job was queued'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'Job status (queued, running, done, failed or expired)',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'id': '3f2b9c1e8a7d4e6f9b0c1d2e3f4a5b6c',
+                        'area_id': 1,
+                        'state': 'done',
+                        'measurements': 120,
+                        'size_bytes': 640000,
+                        'error': None,
+                        'created_on': '2025-05-01T10:00:00',
+                        'started_on': '2025-05-01T10:00:01',
+                        'finished_on': '2025-05-01T10:00:04'
+                    }
+                }
+            }
+        },
+        404: {
+            'description': Messages.ERROR_NOT_FOUND('Report job')
+        }
+    }
+})
+def get_report_job(job_id):
+    job = ReportJobService.get(job_id, get_jwt().get('company_id'), get_jwt_identity())
+    if job is None:
+        return abort(404, description=Messages.ERROR_NOT_FOUND('Report job'))
+    return job
+
+
+@report.route("/jobs/<job_id>/download", methods=["GET"])
+@jwt_required()
+@swag_from({
+    'tags': ['Report'],
+    'summary': 'Download the PDF of a finished report job',
+    'parameters': [
+        {
+            'name': 'job_id',
+            'in': 'path',
+            'required': True,
+            'schema': {'type': 'string'},
+            'description': 'The ID returned when the job was queued'
+        }
+    ],
+    'responses': {
+        200: {
+            'description': 'The report PDF',
+            'content': {'application/pdf': {}}
+        },
+        404: {
+            'description': Messages.ERROR_NOT_FOUND('Report job')
+        },
+        409: {
+            'description': 'The job has not finished yet (or failed)'
+        },
+        410: {
+            'description': 'The PDF was evicted from the report store; queue the report again'
+        }
+    }
+})
+def download_report_job(job_id):
+    company_id, user_id = get_jwt().get('company_id'), get_jwt_identity()
+    job = ReportJobService.get(job_id, company_id, user_id)
+    if job is None:
+        return abort(404, description=Messages.ERROR_NOT_FOUND('Report job'))
+    if job["state"] == "expired":
+        return abort(410, description="Report expired, queue it again")
+    if job["state"] != "done":
+        return abort(409, description=f"Report job is {job['state']}")
+
+    path = ReportJobService.file_path(job_id, company_id, user_id)
+    if path is None:
+        return abort(410, description="Report expired, queue it again")
+    return send_file(path, download_name='relatorio.pdf', mimetype='application/pdf', as_attachment=True)
@@ -10,8 +10,8 @@ from app.models import User, TermsAndCondition, TermsAcceptance
 from app.schemas import UsuarioResponseDTO, TermsAndConditionSchema
 from app.services.email_service import send_email
 from app.services.user_service import UserService
-from app.services.encryption_service import EncryptionService
-from app.database.sqlite import get_sqlite_session
+from app.services.key_management_service import KeyManagementService
+from app.services.key_pool_service import key_pair_pool
 
 users = Blueprint(
     'users',
@@ -145,7 +145,7 @@ def create_user():
     except Exception as e:
         abort(400, description=str(e))
 
-    if User.query.filter_by(email=data['email']).first():
+    if UserService.find_by_email(data['email']):
         abort(409, description='E-mail already taken!')
 
     hashed_password = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt())
@@ -164,6 +164,33 @@ def create_user():
         abort(500, description=str(e).split('\n')[0])
 
 
+@users.route('/key-pool', methods=['GET'])
+@swag_from({
+    'summary': 'Key pair pool statistics',
+    'description': 'Returns the depth and hit/miss counters of the pre-generated RSA key pair pool.',
+    'responses': {
+        200: {
+            'description': 'Pool statistics',
+            'content': {
+                'application/json': {
+                    'example': {
+                        'size': 20,
+                        'low_water': 5,
+                        'depth': 18,
+                        'hits': 120,
+                        'misses': 3,
+                        'running': True
+                    }
+                }
+            }
+        }
+    }
+})
+@jwt_required()
+def get_key_pool_stats():
+    return key_pair_pool.stats(), 200
+
+
 @users.route('/login', methods=['POST'])
 def login():
     if not request.is_json:
@@ -175,55 +202,37 @@ def login():
     if not email or not password:
         abort(400, description='Missing Email and/or Password in request!')
 
-    sqlite_session = get_sqlite_session()
-    users = User.query.all()
+    user = UserService.find_by_email(email)
+    if not user:
+        abort(404, description='User not found!')
 
-    for user in users:
-        cursor = sqlite_session.execute(
-            "SELECT private_key FROM user_keys WHERE user_id = ?", (user.id,)
-        )
-        result = cursor.fetchone()
+    private_key = KeyManagementService.get_private_key(user.id)
+    if private_key is None:
+        abort(404, description='User not found!')
 
-        if not result:
-            continue
+    if not bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
+        abort(401, description='Wrong Password!')
 
-        private_key_pem = result[0]
+    decrypted = UserService.decrypt_users([user], {user.id: private_key})
+    if not decrypted:
+        abort(500, description='Failed to decrypt user name.')
 
-        try:
-            decrypted_email = EncryptionService.decrypt(private_key_pem, user.email)
-        except Exception:
-            continue  
-
-        if decrypted_email == email:
-            if not bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
-                sqlite_session.close()
-                abort(401, description='Wrong Password!')
-
-            try:
-                decrypted_first_name = EncryptionService.decrypt(private_key_pem, user.first_name)
-                decrypted_last_name = EncryptionService.decrypt(private_key_pem, user.last_name)
-            except Exception:
-                sqlite_session.close()
-                abort(500, description='Failed to decrypt user name.')
-
-            access_token = create_access_token(identity=user.id, additional_claims={'company_id': user.company_id})
-
-            user_obj = {
-                "id": user.id,
-                "first_name": decrypted_first_name,
-                "last_name": decrypted_last_name,
-                "email": decrypted_email,
-                "cargo": user.cargo.value
-            }
+    _, values = decrypted[0]
+    UserService.upgrade_on_login(user, private_key, values)
+    access_token = create_access_token(identity=user.id, additional_claims={'company_id': user.company_id})
 
-            sqlite_session.close()
-            return {
-                "access_token": access_token,
-                "user": user_obj
-            }, 200
+    user_obj = {
+        "id": user.id,
+        "first_name": values['first_name'],
+        "last_name": values['last_name'],
+        "email": values['email'],
+        "cargo": user.cargo.value
+    }
 
-    sqlite_session.close()
-    abort(404, description='User not found!')
+    return {
+        "access_token": access_token,
+        "user": user_obj
+    }, 200
 
 
 @users.route('/notify-lgpd-incident', methods=['POST'])
@@ -293,43 +302,19 @@ def notify_lgpd_incident():
 
 
 def decrypt_user_list(user_list):
-    user_obj_list = []
-
-    sqlite_session = get_sqlite_session()
-
-    for u in user_list:
-        if u is None:
-            continue
-
-        cursor = sqlite_session.execute(
-            "SELECT private_key FROM user_keys WHERE user_id = ?", (u.id,)
-        )
-        result = cursor.fetchone()
+    user_list = [u for u in user_list if u is not None]
+    private_keys = KeyManagementService.get_private_keys([u.id for u in user_list])
 
-        if not result:
-            continue
-
-        private_key_pem = result[0]
-
-        try:
-            decrypted_first_name = EncryptionService.decrypt(private_key_pem, u.first_name)
-            decrypted_last_name = EncryptionService.decrypt(private_key_pem, u.last_name)
-            decrypted_email = EncryptionService.decrypt(private_key_pem, u.email)
-        except Exception as e:
-            print(f"[WARN] Falha ao descriptografar usuário ID {u.id}: {e}")
-            continue
-
-        user_obj = {
+    return [
+        {
             "id": u.id,
-            "first_name": decrypted_first_name,
-            "last_name": decrypted_last_name,
-            "email": decrypted_email,
+            "first_name": values['first_name'],
+            "last_name": values['last_name'],
+            "email": values['email'],
             "cargo": u.cargo.value
         }
-        user_obj_list.append(user_obj)
-
-    sqlite_session.close()
-    return user_obj_list
+        for u, values in UserService.decrypt_users(user_list, private_keys)
+    ]
 
 
 @users.route('/terms-and-conditions', methods=['POST', 'GET'])
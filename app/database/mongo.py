@@ -0,0 +1,93 @@
+# app/database/mongo.py
+
+from pymongo import ASCENDING, IndexModel
+
+# Índices por coleção; create_indexes é idempotente para especificações iguais
+MONGO_INDEXES = {
+    "api": [
+        IndexModel([("area_id", ASCENDING), ("measurement_date", ASCENDING)], name="area_id_measurement_date"),
+        IndexModel([("measurement_date", ASCENDING)], name="measurement_date"),
+        IndexModel([("area_id", ASCENDING), ("stage_indicator", ASCENDING)], name="area_id_stage_indicator"),
+        IndexModel(
+            [("environmental_threats", ASCENDING), ("area_id", ASCENDING)],
+            name="environmental_threats_area_id"
+        ),
+    ],
+    "api_monthly": [
+        IndexModel([("area_id", ASCENDING), ("month", ASCENDING)], name="area_id_month"),
+        IndexModel([("month", ASCENDING)], name="month"),
+    ],
+    "api_cities_coordinates": [
+        IndexModel([("NOME_MUNICIPIO", ASCENDING)], name="nome_municipio"),
+    ],
+}
+
+def ensure_indexes(db):
+    """
+    Cria os índices definidos em MONGO_INDEXES. Retorna {coleção: [nomes dos índices]}.
+    """
+    return {
+        collection: db[collection].create_indexes(indexes)
+        for collection, indexes in MONGO_INDEXES.items()
+    }
+
+
+def index_usage(db):
+    """
+    Retorna o uso de cada índice ($indexStats) das coleções gerenciadas.
+    """
+    usage = []
+    for collection in MONGO_INDEXES:
+        for stats in db[collection].aggregate([{"$indexStats": {}}]):
+            usage.append({
+                "collection": collection,
+                "index": stats["name"],
+                "ops": stats["accesses"]["ops"],
+                "since": stats["accesses"]["since"].isoformat()
+            })
+    return usage
+
+
+def _winning_plan_stages(explain):
+    """
+    Percorre o resultado do explain e devolve os estágios dos planos vencedores.
+    """
+    stages = []
+
+    def walk(node, in_winning_plan=False):
+        if isinstance(node, dict):
+            if in_winning_plan and "stage" in node:
+                stages.append(node["stage"])
+            for key, value in node.items():
+                if key == "rejectedPlans":
+                    continue
+                walk(value, in_winning_plan or key in ("winningPlan", "queryPlan"))
+        elif isinstance(node, list):
+            for item in node:
+                walk(item, in_winning_plan)
+
+    walk(explain)
+    return stages
+
+
+def find_collection_scans(db, queries):
+    """
+    Executa explain nas consultas informadas e indica quais usam COLLSCAN.
+    queries: [(endpoint, coleção, {"aggregate": pipeline} ou {"find": filtro})].
+    """
+    report = []
+    for endpoint, collection, query in queries:
+        if "aggregate" in query:
+            command = {"aggregate": collection, "pipeline": query["aggregate"], "cursor": {}}
+        else:
+            command = {"find": collection, "filter": query["find"]}
+
+        explain = db.command("explain", command, verbosity="queryPlanner")
+        stages = _winning_plan_stages(explain)
+        report.append({
+            "endpoint": endpoint,
+            "collection": collection,
+            "collection_scan": "COLLSCAN" in stages,
+            "stages": stages
+        })
+    return report
@@ -0,0 +1,28 @@
+# app/database/postgres.py
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import db
+
+# db.create_all() não altera tabelas existentes; estas instruções são idempotentes
+SCHEMA_UPGRADES = [
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS email_index VARCHAR(64)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email_index ON users (email_index)",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS data_key VARCHAR(500)",
+    "ALTER TABLE users ADD COLUMN IF NOT EXISTS encryption_version INTEGER NOT NULL DEFAULT 1",
+    "CREATE UNIQUE INDEX IF NOT EXISTS uq_localizations_uf_city ON localizations (uf, city)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS companies_cnpj_key ON companies (cnpj)",
+]
+
+def upgrade_schema():
+    """
+    Aplica no Postgres as alterações de schema que o create_all não cobre.
+    """
+    for statement in SCHEMA_UPGRADES:
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text(statement))
+        except SQLAlchemyError as e:
+            # ex.: índice único sobre dados já duplicados; a aplicação sobe mesmo assim
+            print(f"[WARN] Falha ao aplicar alteração de schema '{statement}': {e}")
@@ -1,31 +1,158 @@
 # app/database/sqlite.py
 
-import sqlite3
 import os
+import sqlite3
+import threading
+from contextlib import contextmanager
 
 # Define o caminho do arquivo SQLite (pode ser configurado no .env)
 SQLITE_DB_PATH = os.getenv('SQLITE_DB_PATH', 'user_keys.db')
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+
+# SQLite limita a quantidade de parâmetros por instrução (999 em versões antigas)
+SQLITE_MAX_PARAMS = 900
 
-def get_sqlite_session():
+
+class UserKeyStore:
     """
-    Retorna uma conexão ativa com o banco SQLite.
+    Repositório das chaves privadas dos usuários no SQLite.
+    Mantém uma conexão por thread (recriada após fork), em modo WAL, para que
+    vários workers leiam e escrevam sem 'database is locked'.
     """
-    conn = sqlite3.connect(SQLITE_DB_PATH)
-    return conn
+
+    def __init__(self, db_path=SQLITE_DB_PATH, busy_timeout_ms=SQLITE_BUSY_TIMEOUT_MS):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=True
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    def connection(self):
+        """
+        Retorna a conexão da thread atual, abrindo-a na primeira chamada.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = self._connect()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """
+        Executa o bloco em uma transação (BEGIN IMMEDIATE), com commit ao final
+        ou rollback em caso de erro. Transações aninhadas reaproveitam a externa.
+        """
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._local.depth = 0
+
+    def close(self):
+        """
+        Fecha a conexão da thread atual.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    def init_schema(self):
+        """
+        Cria a tabela user_keys se não existir.
+        """
+        with self.transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS user_keys (
+                    user_id INTEGER PRIMARY KEY,
+                    private_key BLOB NOT NULL
+                );
+            """)
+
+    def get(self, user_id):
+        """
+        Retorna o PEM da chave privada do usuário, ou None.
+        """
+        row = self.connection().execute(
+            "SELECT private_key FROM user_keys WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_many(self, user_ids):
+        """
+        Retorna {user_id: PEM} para os usuários informados, em consultas IN por lote.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        conn = self.connection()
+        keys = {}
+
+        for i in range(0, len(user_ids), SQLITE_MAX_PARAMS):
+            chunk = user_ids[i:i + SQLITE_MAX_PARAMS]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = conn.execute(
+                f"SELECT user_id, private_key FROM user_keys WHERE user_id IN ({placeholders})",
+                chunk
+            ).fetchall()
+            keys.update(rows)
+
+        return keys
+
+    def put(self, user_id, private_key_pem):
+        self.put_many([(user_id, private_key_pem)])
+
+    def put_many(self, items):
+        """
+        Insere ou substitui chaves a partir de pares (user_id, PEM).
+        """
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO user_keys (user_id, private_key) VALUES (?, ?)",
+                items
+            )
+
+    def delete(self, user_id):
+        self.delete_many([user_id])
+
+    def delete_many(self, user_ids):
+        with self.transaction() as conn:
+            conn.executemany(
+                "DELETE FROM user_keys WHERE user_id = ?",
+                [(user_id,) for user_id in user_ids]
+            )
+
+
+user_key_store = UserKeyStore()
+
 
 def init_sqlite_db():
     """
     Inicializa o banco SQLite criando a tabela user_keys se não existir.
     """
-    conn = get_sqlite_session()
-    cursor = conn.cursor()
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_keys (
-            user_id INTEGER PRIMARY KEY,
-            private_key BLOB NOT NULL
-        );
-    """)
-
-    conn.commit()
-    conn.close()
+    user_key_store.init_schema()
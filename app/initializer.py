@@ -8,6 +8,7 @@ from flask import Flask, request, Response
 
 from app.models import User, TermsAcceptance, TermsAndCondition
 from app.database import db
+from app.database.postgres import upgrade_schema
 from app.config import Config
 # from app.util.chat import Chat
 # from app.util.report_messages import chat_template
@@ -36,6 +37,7 @@ def make_shell_context():
 
 with app.app_context():
     db.create_all()
+    upgrade_schema()
 
 @app.before_request
 def basic_authentication():
@@ -3,6 +3,7 @@ from app.models.base import Base, db
 
 class Localization(Base):
     __tablename__ = "localizations"
+    __table_args__ = (db.UniqueConstraint("uf", "city", name="uq_localizations_uf_city"),)
     uf = db.Column(db.String(2), nullable=False)
     city = db.Column(db.String(50), nullable=False)
     altitude = db.Column(db.Float, nullable=False)
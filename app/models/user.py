@@ -11,6 +11,9 @@ class User(Base):
     first_name = db.Column(db.String(350), nullable=False)
     last_name = db.Column(db.String(350), nullable=False)
     email = db.Column(db.String(350), nullable=False, unique=True)
+    email_index = db.Column(db.String(64), unique=True, index=True)
+    data_key = db.Column(db.String(500))
+    encryption_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     password = db.Column(db.String(500), nullable=False)
     cargo = db.Column(db.Enum(CargoEnum), nullable=False)
     # last_terms_and_conditions_accepted = db.Column(db.Boolean, default=False)
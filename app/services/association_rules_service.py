@@ -0,0 +1,150 @@
+# app/services/association_rules_service.py
+import os
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from app.initializer import app, mongo
+from app.util.association_rules import HIGH_SURVIVAL_RATE, PRACTICE_COLUMNS, mine_association_rules
+
+ASSOCIATION_RULES_COLLECTION = "ml_association_rules"
+ASSOCIATION_RULES_ID = "latest"
+# Contador (só cresce) de medições gravadas pela importação e pelo cadastro, comparado com o da última mineração
+INSERTED_MEASUREMENTS_ID = "inserted_measurements"
+
+# Quantidade de medições novas (desde a última mineração) que dispara uma nova execução
+ASSOCIATION_RULES_MIN_NEW_MEASUREMENTS = int(os.getenv('ASSOCIATION_RULES_MIN_NEW_MEASUREMENTS', 1000))
+ASSOCIATION_RULES_MIN_SUPPORT = float(os.getenv('ASSOCIATION_RULES_MIN_SUPPORT', 0.05))
+ASSOCIATION_RULES_MIN_CONFIDENCE = float(os.getenv('ASSOCIATION_RULES_MIN_CONFIDENCE', 0.5))
+ASSOCIATION_RULES_SPARSE = os.getenv('ASSOCIATION_RULES_SPARSE', 'false').lower() == 'true'
+
+
+class AssociationRulesService:
+    """
+    Minera as regras de associação em segundo plano e guarda o resultado na coleção
+    ml_association_rules; as requisições apenas leem o último resultado.
+    """
+    _executor = None
+    _pid = None
+    _running = threading.Lock()
+
+    @staticmethod
+    def _get_executor():
+        # Pools de threads não sobrevivem a um fork; recria por processo
+        if AssociationRulesService._executor is None or AssociationRulesService._pid != os.getpid():
+            AssociationRulesService._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='association-rules'
+            )
+            AssociationRulesService._pid = os.getpid()
+        return AssociationRulesService._executor
+
+    @staticmethod
+    def latest():
+        """
+        Último resultado minerado (ou None se a mineração nunca rodou).
+        """
+        return mongo.db[ASSOCIATION_RULES_COLLECTION].find_one({"_id": ASSOCIATION_RULES_ID})
+
+    @staticmethod
+    def record_inserted(count):
+        """
+        Soma count ao contador de medições gravadas (chamado após cada importação/cadastro).
+        """
+        if count:
+            mongo.db[ASSOCIATION_RULES_COLLECTION].update_one(
+                {"_id": INSERTED_MEASUREMENTS_ID}, {"$inc": {"count": int(count)}}, upsert=True
+            )
+
+    @staticmethod
+    def _inserted_count():
+        counter = mongo.db[ASSOCIATION_RULES_COLLECTION].find_one({"_id": INSERTED_MEASUREMENTS_ID})
+        return counter["count"] if counter else 0
+
+    @staticmethod
+    def new_measurements(result=None):
+        """
+        Medições gravadas desde a última mineração, pelo contador de inserções
+        (remoções não compensam inserções).
+        """
+        result = result if result is not None else AssociationRulesService.latest()
+        inserted = AssociationRulesService._inserted_count()
+        return inserted - result.get("inserted_mark", 0) if result else inserted
+
+    @staticmethod
+    def is_stale(result=None):
+        result = result if result is not None else AssociationRulesService.latest()
+        # Resultados gravados antes do contador existir não têm a marca: minera de novo uma vez
+        if result is None or "inserted_mark" not in result:
+            return True
+        return AssociationRulesService.new_measurements(result) >= ASSOCIATION_RULES_MIN_NEW_MEASUREMENTS
+
+    @staticmethod
+    def mine():
+        """
+        Minera as regras e grava o resultado. Só as medições com alta sobrevivência e
+        as colunas das práticas são lidas do Mongo. Retorna o documento gravado.
+        """
+        start = time.perf_counter()
+        # Lido antes das medições: o que for gravado durante a mineração conta para a próxima
+        inserted_mark = AssociationRulesService._inserted_count()
+        measurement_count = mongo.db.api.estimated_document_count()
+
+        cursor = mongo.db.api.find(
+            {"tree_survival_rate": {"$gt": HIGH_SURVIVAL_RATE}},
+            {"_id": 0, "tree_survival_rate": 1, **{column: 1 for column in PRACTICE_COLUMNS}}
+        )
+        df = pd.DataFrame(list(cursor), columns=PRACTICE_COLUMNS + ["tree_survival_rate"])
+
+        rules = mine_association_rules(
+            df, ASSOCIATION_RULES_MIN_SUPPORT, ASSOCIATION_RULES_MIN_CONFIDENCE, sparse=ASSOCIATION_RULES_SPARSE
+        ) if not df.empty else []
+
+        result = {
+            "_id": ASSOCIATION_RULES_ID,
+            "rules": [
+                {**rule, **{key: float(rule[key]) for key in ("confidence", "lift", "support")}}
+                for rule in rules
+            ],
+            "measurement_count": measurement_count,
+            "inserted_mark": inserted_mark,
+            "rows_mined": len(df),
+            "min_support": ASSOCIATION_RULES_MIN_SUPPORT,
+            "min_confidence": ASSOCIATION_RULES_MIN_CONFIDENCE,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2),
+            "mined_on": datetime.now()
+        }
+        mongo.db[ASSOCIATION_RULES_COLLECTION].replace_one({"_id": ASSOCIATION_RULES_ID}, result, upsert=True)
+        return result
+
+    @staticmethod
+    def refresh(force=False):
+        """
+        Minera novamente se o resultado estiver desatualizado (ou se force=True).
+        Retorna o novo resultado, ou None se não precisou rodar ou outra mineração está em andamento.
+        """
+        if not AssociationRulesService._running.acquire(blocking=False):
+            return None
+        try:
+            if not force and not AssociationRulesService.is_stale():
+                return None
+            return AssociationRulesService.mine()
+        finally:
+            AssociationRulesService._running.release()
+
+    @staticmethod
+    def _run():
+        with app.app_context():
+            try:
+                AssociationRulesService.refresh()
+            except Exception as e:
+                print(f'[WARN] Falha ao minerar regras de associação: {e}')
+
+    @staticmethod
+    def schedule_refresh():
+        """
+        Agenda a mineração em segundo plano; ela só roda se houver medições novas suficientes.
+        """
+        AssociationRulesService._get_executor().submit(AssociationRulesService._run)
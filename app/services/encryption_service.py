@@ -1,8 +1,18 @@
 # app/services/encryption_service.py
+import os
+import hmac
 import base64
+import hashlib
 
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives import serialization, hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+# Versões do formato dos campos criptografados do usuário
+RSA_FIELD_VERSION = 1  # cada campo criptografado com RSA-OAEP
+ENVELOPE_VERSION = 2   # chave AES-GCM por usuário, protegida com RSA-OAEP
+
+AES_NONCE_SIZE = 12
 
 class EncryptionService:
     @staticmethod
@@ -49,13 +59,22 @@ class EncryptionService:
 
 
     @staticmethod
-    def decrypt(private_key_pem, ciphertext: str) -> str:
+    def load_private_key(private_key_pem):
+        """
+        Carrega a chave privada a partir do PEM armazenado.
+        """
+        return serialization.load_pem_private_key(private_key_pem, password=None)
+
+    @staticmethod
+    def decrypt(private_key, ciphertext: str) -> str:
         """
-        Descriptografa uma string usando a chave privada.
+        Descriptografa uma string usando a chave privada (PEM ou chave já carregada).
         """
         ciphertext = base64.b64decode(ciphertext)
 
-        private_key = serialization.load_pem_private_key(private_key_pem, password=None)
+        if isinstance(private_key, bytes):
+            private_key = EncryptionService.load_private_key(private_key)
+
         plaintext = private_key.decrypt(
             ciphertext,
             padding.OAEP(
@@ -65,3 +84,76 @@ class EncryptionService:
             )
         )
         return plaintext.decode('utf-8')
+
+    @staticmethod
+    def blind_index(value: str) -> str:
+        """
+        Gera um índice cego (HMAC-SHA256) determinístico do valor, permitindo buscas
+        por igualdade sem descriptografar os registros. O valor não é normalizado,
+        mantendo a comparação exata (sensível a maiúsculas) que o login sempre fez.
+        """
+        key = os.environ.get('BLIND_INDEX_KEY') or os.environ.get('SECRET_KEY')
+        if not key:
+            raise RuntimeError('BLIND_INDEX_KEY (ou SECRET_KEY) não configurada.')
+
+        return hmac.new(key.encode('utf-8'), value.encode('utf-8'), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def generate_data_key() -> bytes:
+        """
+        Gera uma chave simétrica AES-256 para o envelope do usuário.
+        """
+        return AESGCM.generate_key(bit_length=256)
+
+    @staticmethod
+    def wrap_data_key(public_key, data_key: bytes) -> str:
+        """
+        Protege a chave simétrica com a chave pública RSA (PEM ou chave já carregada).
+        """
+        if isinstance(public_key, bytes):
+            public_key = serialization.load_pem_public_key(public_key)
+
+        wrapped = public_key.encrypt(
+            data_key,
+            padding.OAEP(
+                mgf=padding.MGF1(algorithm=hashes.SHA256()),
+                algorithm=hashes.SHA256(),
+                label=None
+            )
+        )
+        return base64.b64encode(wrapped).decode('utf-8')
+
+    @staticmethod
+    def unwrap_data_key(private_key, wrapped_data_key: str) -> bytes:
+        """
+        Recupera a chave simétrica usando a chave privada RSA (PEM ou chave já carregada).
+        """
+        if isinstance(private_key, bytes):
+            private_key = EncryptionService.load_private_key(private_key)
+
+        return private_key.decrypt(
+            base64.b64decode(wrapped_data_key),
+            padding.OAEP(
+                mgf=padding.MGF1(algorithm=hashes.SHA256()),
+                algorithm=hashes.SHA256(),
+                label=None
+            )
+        )
+
+    @staticmethod
+    def seal(data_key: bytes, plaintext: str, field: str) -> str:
+        """
+        Criptografa um campo com AES-GCM; o nome do campo é autenticado junto.
+        """
+        nonce = os.urandom(AES_NONCE_SIZE)
+        ciphertext = AESGCM(data_key).encrypt(nonce, plaintext.encode('utf-8'), field.encode('utf-8'))
+        return base64.b64encode(nonce + ciphertext).decode('utf-8')
+
+    @staticmethod
+    def unseal(data_key: bytes, token: str, field: str) -> str:
+        """
+        Descriptografa um campo selado com AES-GCM.
+        """
+        raw = base64.b64decode(token)
+        nonce, ciphertext = raw[:AES_NONCE_SIZE], raw[AES_NONCE_SIZE:]
+        return AESGCM(data_key).decrypt(nonce, ciphertext, field.encode('utf-8')).decode('utf-8')
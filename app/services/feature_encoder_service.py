@@ -0,0 +1,180 @@
+# app/services/feature_encoder_service.py
+import numpy as np
+import pandas as pd
+
+NUMERIC_FEATURES = [
+    'number_of_trees_lost',
+    'avoided_co2_emissions_cubic_meters',
+    'average_tree_growth_cm',
+    'total_project_cost_brl',
+    'living_trees_to_date',
+    'soil_fertility_index_percent'
+]
+CATEGORICAL_FEATURES = [
+    'water_sources',
+    'pest_management',
+    'fertilization',
+    'irrigation',
+    'environmental_threats',
+    'stage_indicator',
+    'water_quality_indicators'
+]
+
+UNKNOWN_IGNORE = 'ignore'
+UNKNOWN_ERROR = 'error'
+
+
+class UnknownCategoryError(ValueError):
+    def __init__(self, unknown):
+        self.unknown = unknown  # {campo: [valores desconhecidos]}
+        super().__init__("Unknown categories: " + "; ".join(
+            f"{field}={values}" for field, values in unknown.items()
+        ))
+
+
+class OneHotEncoder:
+    """
+    Codificador one-hot pré-compilado a partir da lista de colunas do modelo
+    (columns_used.pkl): cada valor categórico aponta direto para o índice da sua
+    coluna e os registros são escritos em uma matriz NumPy pré-alocada, sem
+    criar DataFrames nem chamar get_dummies a cada predição.
+
+    Categorias desconhecidas: com unknown=UNKNOWN_IGNORE a linha fica com todas as
+    colunas daquele campo zeradas (mesmo resultado de get_dummies + reindex);
+    com unknown=UNKNOWN_ERROR é lançado UnknownCategoryError.
+    """
+
+    def __init__(self, columns, numeric_features=NUMERIC_FEATURES, categorical_features=CATEGORICAL_FEATURES):
+        self.columns = list(columns)
+        self.n_features = len(self.columns)
+        self.numeric_index = {}
+        self.category_index = {feature: {} for feature in categorical_features}
+
+        # Prefixos mais longos primeiro, para que um campo que seja prefixo de outro não capture suas colunas
+        prefixes = sorted(categorical_features, key=len, reverse=True)
+        for index, column in enumerate(self.columns):
+            if column in numeric_features:
+                self.numeric_index[column] = index
+                continue
+            feature = next((prefix for prefix in prefixes if column.startswith(prefix + '_')), None)
+            if feature is None:
+                raise ValueError(f"Column '{column}' does not match any known feature")
+            self.category_index[feature][column[len(feature) + 1:]] = index
+
+    def categories(self):
+        """
+        Retorna {campo: [valores conhecidos pelo modelo]}.
+        """
+        return {feature: list(values) for feature, values in self.category_index.items()}
+
+    def encode_record(self, record, unknown=UNKNOWN_IGNORE):
+        """
+        Codifica um registro (dict) em uma matriz 1 x n_features. Campos numéricos
+        ausentes valem 0; campos categóricos ausentes geram KeyError.
+        """
+        row = np.zeros((1, self.n_features))
+        for feature, index in self.numeric_index.items():
+            value = record.get(feature)
+            row[0, index] = 0 if value is None else float(value)
+
+        unknown_values = {}
+        for feature, values in self.category_index.items():
+            value = record[feature]
+            index = values.get(value)
+            if index is None:
+                unknown_values[feature] = [value]
+            else:
+                row[0, index] = 1
+
+        if unknown_values and unknown == UNKNOWN_ERROR:
+            raise UnknownCategoryError(unknown_values)
+        return row
+
+    def encode_frame(self, df, unknown=UNKNOWN_IGNORE):
+        """
+        Codifica um DataFrame de registros em uma matriz len(df) x n_features,
+        preenchendo uma coluna (numérica) ou um campo categórico por vez.
+        """
+        missing = [feature for feature in self.category_index
+                   if feature not in df.columns or df[feature].isna().any()]
+        if missing:
+            raise KeyError(", ".join(missing))
+
+        matrix = np.zeros((len(df), self.n_features))
+        for feature, index in self.numeric_index.items():
+            if feature in df.columns:
+                matrix[:, index] = pd.to_numeric(df[feature]).fillna(0).to_numpy(dtype=float)
+
+        rows = np.arange(len(df))
+        unknown_values = {}
+        for feature, values in self.category_index.items():
+            indexes = df[feature].map(values)
+            known = indexes.notna().to_numpy()
+            if not known.all():
+                unknown_values[feature] = sorted(map(str, df[feature][~known].unique()))
+            matrix[rows[known], indexes[known].to_numpy(dtype=int)] = 1
+
+        if unknown_values and unknown == UNKNOWN_ERROR:
+            raise UnknownCategoryError(unknown_values)
+        return matrix
+
+    def encode_records(self, records, unknown=UNKNOWN_IGNORE):
+        """
+        Codifica uma lista de dicts (ver encode_frame).
+        """
+        return self.encode_frame(pd.DataFrame.from_records(records), unknown)
+
+    def to_frame(self, matrix):
+        """
+        Matriz codificada como DataFrame com os nomes das colunas, para estimadores
+        ajustados com nomes de features (sem copiar os dados).
+        """
+        return pd.DataFrame(matrix, columns=self.columns, copy=False)
+
+
+def reference_encode(records, columns, numeric_features=NUMERIC_FEATURES, categorical_features=CATEGORICAL_FEATURES):
+    """
+    Codificação original do predict_tree_health (numéricos ausentes = 0, pd.get_dummies
+    e colunas faltantes preenchidas com 0), mantida como referência para a
+    verificação de paridade do OneHotEncoder.
+    """
+    input_data = [
+        {**{feature: record.get(feature, 0) for feature in numeric_features},
+         **{feature: record[feature] for feature in categorical_features}}
+        for record in records
+    ]
+    df_encoded = pd.get_dummies(pd.DataFrame(input_data), columns=categorical_features)
+    for col in columns:
+        if col not in df_encoded.columns:
+            df_encoded[col] = 0
+    return df_encoded[columns].to_numpy(dtype=float)
+
+
+def check_parity(encoder, unknown_value='__unknown__'):
+    """
+    Compara o OneHotEncoder com reference_encode em registros que cobrem todas as
+    categorias conhecidas, uma categoria desconhecida por campo e campos numéricos
+    ausentes. Retorna (quantidade de registros, lista de divergências).
+    """
+    categories = encoder.categories()
+    size = max(len(values) for values in categories.values()) + 1
+    records = []
+    for i in range(size):
+        record = {
+            feature: (values + [unknown_value])[i % (len(values) + 1)]
+            for feature, values in categories.items()
+        }
+        for position, feature in enumerate(encoder.numeric_index):
+            if (i + position) % 3:
+                record[feature] = float(i * 10 + position)
+        records.append(record)
+
+    expected = reference_encode(records, encoder.columns, list(encoder.numeric_index), list(categories))
+    mismatches = []
+    encoded_frame = encoder.encode_records(records)
+    for i, record in enumerate(records):
+        for label, encoded in (('record', encoder.encode_record(record)[0]), ('frame', encoded_frame[i])):
+            if not np.array_equal(encoded, expected[i]):
+                columns = [encoder.columns[j] for j in np.flatnonzero(encoded != expected[i])]
+                mismatches.append({'record': i, 'path': label, 'columns': columns})
+    return len(records), mismatches
@@ -0,0 +1,154 @@
+# app/services/import_job_service.py
+import os
+import uuid
+import tempfile
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from app.initializer import app, mongo
+from app.services.import_service import ImportService
+from app.util.utils import process_owner, owner_is_gone
+
+IMPORT_SPOOL_PATH = os.getenv(
+    'IMPORT_SPOOL_PATH',
+    os.path.join(os.getenv('TEMPORARY_FOLDER_PATH') or tempfile.gettempdir(), 'imports')
+)
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', 2))
+
+IMPORT_JOB_KINDS = {
+    "csv_sql": lambda path, **options: ImportService.import_areas(path, **options),
+    "csv_nosql": lambda path, **options: ImportService.import_measurements(path, **options),
+    "cities_coordinates": lambda path, **options: ImportService.import_collection(
+        mongo.db.api_cities_coordinates, path, **options
+    ),
+    "inmet": lambda path, **options: ImportService.import_collection(mongo.db.api_inmet, path, **options),
+}
+
+
+class ImportJobService:
+    """
+    Executa importações em segundo plano: o upload é gravado em disco, o job é
+    registrado na coleção import_jobs do Mongo e um pool de threads faz a importação.
+    """
+    _executor = None
+    _pid = None
+
+    @staticmethod
+    def _get_executor():
+        # Pools de threads não sobrevivem a um fork; recria por processo
+        if ImportJobService._executor is None or ImportJobService._pid != os.getpid():
+            ImportJobService._executor = ThreadPoolExecutor(
+                max_workers=IMPORT_WORKERS, thread_name_prefix='import-job'
+            )
+            ImportJobService._pid = os.getpid()
+        return ImportJobService._executor
+
+    @staticmethod
+    def submit(kind, file, **options):
+        """
+        Grava o arquivo enviado em disco, registra o job e o agenda. Retorna o id do job.
+        """
+        job_id = uuid.uuid4().hex
+        os.makedirs(IMPORT_SPOOL_PATH, exist_ok=True)
+        path = ImportJobService.spool_path(job_id)
+        file.save(path)
+
+        mongo.db.import_jobs.insert_one({
+            "_id": job_id,
+            "kind": kind,
+            "filename": file.filename,
+            "options": options,
+            **process_owner(),
+            "state": "queued",
+            "rows_processed": 0,
+            "errors": [],
+            "result": None,
+            "created_on": datetime.now(),
+            "started_on": None,
+            "finished_on": None
+        })
+
+        ImportJobService._get_executor().submit(ImportJobService._run, job_id, kind, path, options)
+        return job_id
+
+    @staticmethod
+    def spool_path(job_id):
+        return os.path.join(IMPORT_SPOOL_PATH, f'{job_id}.csv')
+
+    @staticmethod
+    def recover_interrupted():
+        """
+        Marca como falhos os jobs queued/running cujo processo não existe mais (reinício
+        ou queda da API) e remove os arquivos deles do spool. Retorna a quantidade.
+        """
+        jobs = mongo.db.import_jobs
+        recovered = 0
+        for job in jobs.find({"state": {"$in": ["queued", "running"]}}, {"host": 1, "pid": 1}):
+            if not owner_is_gone(job):
+                continue
+
+            result = jobs.update_one({"_id": job["_id"], "state": {"$in": ["queued", "running"]}}, {"$set": {
+                "state": "failed",
+                "errors": ["Import interrupted by an API restart, upload the file again"],
+                "finished_on": datetime.now()
+            }})
+            path = ImportJobService.spool_path(job["_id"])
+            if os.path.exists(path):
+                os.remove(path)
+            recovered += result.modified_count
+        return recovered
+
+    @staticmethod
+    def _run(job_id, kind, path, options):
+        with app.app_context():
+            jobs = mongo.db.import_jobs
+            jobs.update_one({"_id": job_id}, {"$set": {"state": "running", "started_on": datetime.now()}})
+
+            def progress(rows):
+                jobs.update_one({"_id": job_id}, {"$set": {"rows_processed": rows}})
+
+            try:
+                result = IMPORT_JOB_KINDS[kind](path, progress=progress, **options)
+                errors = [f"Unmatched area name: {name}" for name in result.get("unmatched_area_names", [])]
+                jobs.update_one({"_id": job_id}, {"$set": {
+                    "state": "done",
+                    "result": result,
+                    "errors": errors,
+                    "finished_on": datetime.now()
+                }})
+            except Exception as e:
+                jobs.update_one({"_id": job_id}, {"$set": {
+                    "state": "failed",
+                    "errors": [str(e)],
+                    "finished_on": datetime.now()
+                }})
+            finally:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    @staticmethod
+    def get(job_id):
+        """
+        Retorna o status do job (ou None), com a vazão calculada em linhas por segundo.
+        """
+        job = mongo.db.import_jobs.find_one({"_id": job_id})
+        if not job:
+            return None
+
+        started_on = job.get("started_on")
+        finished_on = job.get("finished_on") or datetime.now()
+        elapsed_seconds = (finished_on - started_on).total_seconds() if started_on else 0
+
+        return {
+            "id": job["_id"],
+            "kind": job["kind"],
+            "filename": job.get("filename"),
+            "state": job["state"],
+            "rows_processed": job.get("rows_processed", 0),
+            "errors": job.get("errors", []),
+            "rows_per_second": round(job.get("rows_processed", 0) / elapsed_seconds, 2) if elapsed_seconds else None,
+            "result": job.get("result"),
+            "created_on": job["created_on"].isoformat(),
+            "started_on": started_on.isoformat() if started_on else None,
+            "finished_on": job["finished_on"].isoformat() if job.get("finished_on") else None
+        }
@@ -0,0 +1,258 @@
+# app/services/import_service.py
+import time
+from contextlib import contextmanager
+
+import os
+
+import pandas as pd
+from pymongo.errors import BulkWriteError
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.database import db
+from app.models import Area, Localization, Company
+from app.initializer import mongo
+from app.services.rollup_service import RollupService
+from app.services.response_cache_service import response_cache
+from app.services.association_rules_service import AssociationRulesService
+
+AREA_COLUMNS = [
+    "area_name", "number_of_trees_planted", "planting_techniques", "total_area_hectares",
+    "reflorested_area_hectares", "planted_species", "initial_planted_area_hectares",
+    "initial_vegetation_cover", "company_name", "cnpj", "uf", "city", "altitude", "soil_type"
+]
+
+MEASUREMENT_COLUMNS = [
+    "soil_fertility_index_percent", "area_code", "area_name",
+    "avoided_co2_emissions_cubic_meters", "number_of_trees_lost", "tree_health_status",
+    "average_tree_growth_cm", "water_sources", "water_quality_indicators",
+    "pest_management", "fertilization", "irrigation", "environmental_threats",
+    "total_project_cost_brl", "funding_source", "stage_indicator", "measurement_date",
+    "living_trees_to_date", "tree_survival_rate"
+]
+MEASUREMENT_FLOAT_COLUMNS = [
+    "avoided_co2_emissions_cubic_meters", "average_tree_growth_cm", "total_project_cost_brl", "tree_survival_rate"
+]
+MEASUREMENT_INT_COLUMNS = ["number_of_trees_lost", "living_trees_to_date"]
+
+# Documentos por chamada insert_many no Mongo
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+
+# Linhas por instrução INSERT (o Postgres aceita até 65535 parâmetros por instrução)
+UPSERT_CHUNK_SIZE = 1000
+
+
+class InvalidImportFile(ValueError):
+    pass
+
+
+class ImportStats:
+    """
+    Acumula quantidade de linhas e tempo gasto em cada etapa de uma importação.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        stage = {"rows": 0}
+        yield stage
+        stage["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self.stages[name] = stage
+
+    def to_dict(self):
+        return {
+            "elapsed_ms": round((time.perf_counter() - self.started) * 1000, 2),
+            "stages": self.stages
+        }
+
+
+class ImportService:
+    @staticmethod
+    def _upsert(model, records, index_elements, returning):
+        """
+        INSERT ... ON CONFLICT DO UPDATE em lotes, retornando id e chave de todas as linhas
+        (novas ou já existentes). O UPDATE é neutro e só existe para o RETURNING devolver as existentes.
+        """
+        rows = []
+        for i in range(0, len(records), UPSERT_CHUNK_SIZE):
+            stmt = pg_insert(model).values(records[i:i + UPSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=index_elements,
+                set_={index_elements[0]: stmt.excluded[index_elements[0]]}
+            ).returning(*returning)
+            rows.extend(db.session.execute(stmt).all())
+        return pd.DataFrame(rows, columns=[column.key for column in returning])
+
+    @staticmethod
+    def import_areas(file, progress=None):
+        """
+        Importa áreas (com localizações e empresas) de um CSV em uma única transação,
+        usando operações em conjunto em vez de consultas por linha.
+        """
+        stats = ImportStats()
+
+        with stats.stage("parse") as stage:
+            df = pd.read_csv(file, decimal=",")
+            missing_columns = [col for col in AREA_COLUMNS if col not in df.columns]
+            if missing_columns:
+                raise InvalidImportFile("Missing required columns in file")
+
+            df["cnpj"] = df["cnpj"].astype(str)
+            df["altitude"] = df["altitude"].astype(float)
+            df["number_of_trees_planted"] = df["number_of_trees_planted"].astype(int)
+            df["total_area_hectares"] = df["total_area_hectares"].astype(float)
+            df["reflorested_area_hectares"] = df["reflorested_area_hectares"].astype(float)
+            stage["rows"] = len(df)
+
+        try:
+            with stats.stage("localizations") as stage:
+                localizations = df.drop_duplicates(subset=["uf", "city"])[["uf", "city", "altitude", "soil_type"]]
+                localization_ids = ImportService._upsert(
+                    Localization, localizations.to_dict(orient="records"),
+                    ["uf", "city"], [Localization.id, Localization.uf, Localization.city]
+                )
+                stage["rows"] = len(localization_ids)
+
+            with stats.stage("companies") as stage:
+                companies = df.drop_duplicates(subset=["cnpj"])[["cnpj", "company_name"]] \
+                    .rename(columns={"company_name": "name"})
+                company_ids = ImportService._upsert(
+                    Company, companies.to_dict(orient="records"),
+                    ["cnpj"], [Company.id, Company.cnpj]
+                )
+                stage["rows"] = len(company_ids)
+
+            with stats.stage("map_ids") as stage:
+                df = df.merge(
+                    localization_ids.rename(columns={"id": "localization_id"}), on=["uf", "city"], how="left"
+                ).merge(
+                    company_ids.rename(columns={"id": "company_id"}), on="cnpj", how="left"
+                )
+                stage["rows"] = len(df)
+
+            with stats.stage("areas") as stage:
+                areas = df[[
+                    "area_name", "number_of_trees_planted", "planting_techniques", "total_area_hectares",
+                    "reflorested_area_hectares", "planted_species", "initial_planted_area_hectares",
+                    "initial_vegetation_cover", "localization_id", "company_id"
+                ]].to_dict(orient="records")
+                if areas:
+                    db.session.execute(insert(Area), areas)
+                stage["rows"] = len(areas)
+
+            db.session.commit()
+            response_cache.bump()
+            if progress:
+                progress(len(areas))
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return stats.to_dict()
+
+    @staticmethod
+    def _insert_batches(collection, records, batch_size, stage, progress=None):
+        """
+        Grava os documentos com insert_many não ordenado em lotes de batch_size.
+        """
+        stage.setdefault("batches", 0)
+        stage.setdefault("write_errors", 0)
+
+        for i in range(0, len(records), batch_size):
+            batch = records[i:i + batch_size]
+            try:
+                result = collection.insert_many(batch, ordered=False)
+                stage["rows"] += len(result.inserted_ids)
+            except BulkWriteError as e:
+                stage["rows"] += e.details.get("nInserted", 0)
+                stage["write_errors"] += len(e.details.get("writeErrors", []))
+            stage["batches"] += 1
+            if progress:
+                progress(stage["rows"])
+
+    @staticmethod
+    def import_measurements(file, batch_size=IMPORT_BATCH_SIZE, progress=None):
+        """
+        Importa medições das áreas para o Mongo: resolve os nomes das áreas em uma
+        única consulta IN, converte as colunas de forma vetorizada e grava em lotes.
+        """
+        stats = ImportStats()
+
+        with stats.stage("parse") as stage:
+            df = pd.read_csv(file, decimal=",")
+            missing_columns = [col for col in MEASUREMENT_COLUMNS if col not in df.columns]
+            if missing_columns:
+                raise InvalidImportFile(f"Missing required columns in file - missing_columns: {missing_columns}")
+            stage["rows"] = len(df)
+
+        with stats.stage("resolve_areas") as stage:
+            area_names = df["area_name"].dropna().unique().tolist()
+            areas = db.session.query(Area.area_name, Area.id) \
+                .filter(Area.area_name.in_(area_names)) \
+                .order_by(Area.id.desc()).all() if area_names else []
+            area_ids = {area.area_name: area.id for area in areas}
+
+            df["area_id"] = df["area_name"].map(area_ids)
+            unmatched = df.loc[df["area_id"].isna(), "area_name"].dropna().unique().tolist()
+            df = df[df["area_id"].notna()]
+            stage["rows"] = len(df)
+
+        with stats.stage("convert") as stage:
+            df = df[["area_id"] + MEASUREMENT_COLUMNS].copy()
+            df["area_id"] = df["area_id"].astype(int)
+            df[MEASUREMENT_FLOAT_COLUMNS] = df[MEASUREMENT_FLOAT_COLUMNS].astype(float)
+            df[MEASUREMENT_INT_COLUMNS] = df[MEASUREMENT_INT_COLUMNS].astype(int)
+            df["measurement_date"] = pd.Series(
+                pd.to_datetime(df["measurement_date"], format="%Y-%m-%d").dt.to_pydatetime(),
+                index=df.index, dtype=object
+            )
+            records = df.to_dict(orient="records")
+            stage["rows"] = len(records)
+
+        with stats.stage("insert") as stage:
+            ImportService._insert_batches(mongo.db.api, records, batch_size, stage, progress)
+
+        with stats.stage("rollup") as stage:
+            RollupService.refresh_for(records)
+            stage["rows"] = len(records)
+
+        response_cache.bump()
+        AssociationRulesService.record_inserted(stats.stages["insert"]["rows"])
+        AssociationRulesService.schedule_refresh()
+
+        return {
+            **stats.to_dict(),
+            "rows": stats.stages["parse"]["rows"],
+            "inserted": stats.stages["insert"]["rows"],
+            "unmatched_area_names": unmatched
+        }
+
+    @staticmethod
+    def import_collection(collection, file, chunk_size=IMPORT_BATCH_SIZE, progress=None):
+        """
+        Importa um CSV para a coleção em modo streaming: o arquivo é lido em blocos de
+        chunk_size linhas e cada bloco é gravado com um insert_many, mantendo a memória
+        constante independente do tamanho do arquivo.
+        """
+        stats = ImportStats()
+
+        with stats.stage("insert") as stage:
+            stage["batches"] = 0
+            stage["write_errors"] = 0
+            for chunk in pd.read_csv(file, decimal=",", chunksize=chunk_size):
+                ImportService._insert_batches(
+                    collection, chunk.to_dict(orient="records"), chunk_size, stage, progress
+                )
+
+        result = stats.to_dict()
+        elapsed_seconds = result["elapsed_ms"] / 1000
+        return {
+            **result,
+            "rows": stats.stages["insert"]["rows"],
+            "batches": stats.stages["insert"]["batches"],
+            "rows_per_second": round(stats.stages["insert"]["rows"] / elapsed_seconds, 2) if elapsed_seconds else None
+        }
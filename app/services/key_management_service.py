@@ -0,0 +1,63 @@
+# app/services/key_management_service.py
+import os
+import threading
+
+from cachetools import TTLCache
+
+from app.database.sqlite import user_key_store
+from app.services.encryption_service import EncryptionService
+
+KEY_CACHE_MAX_SIZE = int(os.getenv('KEY_CACHE_MAX_SIZE', 10000))
+KEY_CACHE_TTL_SECONDS = int(os.getenv('KEY_CACHE_TTL_SECONDS', 300))
+
+
+class KeyManagementService:
+    _cache = TTLCache(maxsize=KEY_CACHE_MAX_SIZE, ttl=KEY_CACHE_TTL_SECONDS)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_private_keys(user_ids):
+        """
+        Retorna {user_id: chave privada já carregada} para os usuários informados.
+        Chaves fora do cache são buscadas em uma única consulta IN e carregadas uma vez.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        keys = {}
+
+        with KeyManagementService._lock:
+            for user_id in user_ids:
+                private_key = KeyManagementService._cache.get(user_id)
+                if private_key is not None:
+                    keys[user_id] = private_key
+
+        missing = [user_id for user_id in user_ids if user_id not in keys]
+        if not missing:
+            return keys
+
+        for user_id, private_key_pem in user_key_store.get_many(missing).items():
+            keys[user_id] = EncryptionService.load_private_key(private_key_pem)
+
+        with KeyManagementService._lock:
+            for user_id in missing:
+                if user_id in keys:
+                    KeyManagementService._cache[user_id] = keys[user_id]
+
+        return keys
+
+    @staticmethod
+    def get_private_key(user_id):
+        """
+        Retorna a chave privada carregada de um usuário, ou None se não existir.
+        """
+        return KeyManagementService.get_private_keys([user_id]).get(user_id)
+
+    @staticmethod
+    def invalidate(user_id=None):
+        """
+        Remove a chave de um usuário do cache (ou todo o cache, se user_id for None).
+        """
+        with KeyManagementService._lock:
+            if user_id is None:
+                KeyManagementService._cache.clear()
+            else:
+                KeyManagementService._cache.pop(user_id, None)
@@ -0,0 +1,93 @@
+# app/services/key_pool_service.py
+import os
+import queue
+import threading
+
+from app.services.encryption_service import EncryptionService
+
+KEY_POOL_SIZE = int(os.getenv('KEY_POOL_SIZE', 20))
+KEY_POOL_LOW_WATER = int(os.getenv('KEY_POOL_LOW_WATER', 5))
+
+
+class KeyPairPool:
+    """
+    Mantém pares de chaves RSA pré-gerados por uma thread em segundo plano,
+    tirando a geração da chave do caminho da requisição.
+    """
+
+    def __init__(self, size=KEY_POOL_SIZE, low_water=KEY_POOL_LOW_WATER):
+        self.size = size
+        self.low_water = min(low_water, size)
+        self._reset()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        # Após um fork o processo filho não pode reaproveitar nada do pai: os pares já
+        # gerados seriam entregues também pelos outros workers, e a fila/locks podem
+        # ter sido copiados no meio de uma operação (travados)
+        self._queue = queue.Queue(maxsize=max(self.size, 1))
+        self._refill = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = os.getpid()
+        self._hits = 0
+        self._misses = 0
+
+    def start(self):
+        """
+        Inicia o worker de reposição (com fila própria em cada processo).
+        """
+        if self.size <= 0:
+            return
+
+        if self._pid != os.getpid():
+            self._reset()
+
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+
+            self._thread = threading.Thread(target=self._run, name='key-pair-pool', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            while not self._queue.full():
+                self._queue.put(EncryptionService.generate_keys())
+            self._refill.wait()
+            self._refill.clear()
+
+    def acquire(self):
+        """
+        Retorna (private_pem, public_pem) do pool; gera na hora apenas se o pool estiver vazio.
+        """
+        self.start()
+
+        try:
+            key_pair = self._queue.get_nowait()
+            with self._lock:
+                self._hits += 1
+        except queue.Empty:
+            key_pair = EncryptionService.generate_keys()
+            with self._lock:
+                self._misses += 1
+
+        if self._queue.qsize() <= self.low_water:
+            self._refill.set()
+
+        return key_pair
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "low_water": self.low_water,
+                "depth": self._queue.qsize(),
+                "hits": self._hits,
+                "misses": self._misses,
+                "running": bool(self._thread and self._thread.is_alive() and self._pid == os.getpid())
+            }
+
+
+key_pair_pool = KeyPairPool()
@@ -0,0 +1,139 @@
+# app/services/measurement_count_service.py
+import os
+import threading
+
+from cachetools import TTLCache
+from pymongo.errors import OperationFailure
+
+from app.database import db
+from app.initializer import mongo
+from app.models import Area, Localization
+from app.services.response_cache_service import response_cache
+
+AREA_UF_MAP_TTL_SECONDS = int(os.getenv('AREA_UF_MAP_TTL_SECONDS', 600))
+MEASUREMENT_DOMAINS_TTL_SECONDS = int(os.getenv('MEASUREMENT_DOMAINS_TTL_SECONDS', 3600))
+
+
+class MeasurementCountService:
+    # Mapa {area_id: uf} de todas as áreas, indexado pela versão dos dados do response_cache
+    # (compartilhada entre os processos pelo Mongo: uma gravação em um worker invalida todos)
+    _area_ufs = TTLCache(maxsize=1, ttl=AREA_UF_MAP_TTL_SECONDS)
+    # Valores distintos dos campos categóricos, indexados por (versão dos dados, campos)
+    _domains = TTLCache(maxsize=8, ttl=MEASUREMENT_DOMAINS_TTL_SECONDS)
+    _lock = threading.Lock()
+
+    @staticmethod
+    def domains(fields):
+        """
+        Valores distintos de cada campo ({campo: [valores ordenados]}) em uma única
+        agregação $group/$addToSet, em cache até o TTL ou a próxima gravação de
+        medições em qualquer processo (response_cache.bump()). Só valores texto entram:
+        células vazias do CSV chegam ao Mongo como NaN.
+        """
+        key = (response_cache.version, tuple(fields))
+        with MeasurementCountService._lock:
+            domains = MeasurementCountService._domains.get(key)
+        if domains is not None:
+            return domains
+
+        result = next(mongo.db.api.aggregate([
+            {"$group": {"_id": None, **{field: {"$addToSet": f"${field}"} for field in fields}}}
+        ]), {})
+        domains = {
+            field: sorted(value for value in result.get(field, []) if isinstance(value, str))
+            for field in fields
+        }
+
+        with MeasurementCountService._lock:
+            MeasurementCountService._domains[key] = domains
+        return domains
+
+    @staticmethod
+    def all_area_ufs():
+        """
+        Retorna {area_id: uf} de todas as áreas, em cache até o TTL ou a próxima
+        gravação de áreas em qualquer processo (response_cache.bump()).
+        """
+        version = response_cache.version
+        with MeasurementCountService._lock:
+            area_ufs = MeasurementCountService._area_ufs.get(version)
+        if area_ufs is not None:
+            return area_ufs
+
+        area_ufs = MeasurementCountService.area_uf_map()
+        with MeasurementCountService._lock:
+            MeasurementCountService._area_ufs.clear()
+            MeasurementCountService._area_ufs[version] = area_ufs
+        return area_ufs
+
+    @staticmethod
+    def area_uf_map(ufs=None):
+        """
+        Retorna {area_id: uf} das áreas das UFs informadas (todas, se ufs for vazio).
+        """
+        query = db.session.query(Area.id, Localization.uf) \
+            .join(Localization, Area.localization_id == Localization.id)
+        if ufs:
+            query = query.filter(Localization.uf.in_([uf.upper() for uf in ufs]))
+        return {area.id: area.uf.upper() for area in query.all()}
+
+    @staticmethod
+    def count_pipeline(field, area_ids=None, values=None):
+        """
+        Pipeline de contagem de medições por (area_id, valor de field).
+        """
+        match = {}
+        if area_ids is not None:
+            match["area_id"] = {"$in": list(area_ids)}
+        if values:
+            match[field] = {"$in": list(values)}
+
+        return [
+            {"$match": match},
+            {"$group": {"_id": {"area_id": "$area_id", "value": f"${field}"}, "count": {"$sum": 1}}}
+        ]
+
+    @staticmethod
+    def count_by_area(field, area_ids=None, values=None, hint=None):
+        """
+        Conta as medições por (area_id, valor de field) com $group no Mongo.
+        Retorna apenas os documentos de contagem: [{"area_id", "value", "count"}, ...].
+        hint permite forçar um índice que cubra (field, area_id) quando não há filtro.
+        """
+        pipeline = MeasurementCountService.count_pipeline(field, area_ids, values)
+        docs = None
+        if hint:
+            try:
+                docs = list(mongo.db.api.aggregate(pipeline, hint=hint))
+            except OperationFailure:
+                # Índice do hint ausente (ex.: MONGO_ENSURE_INDEXES=false): deixa o planner escolher
+                docs = None
+        if docs is None:
+            docs = list(mongo.db.api.aggregate(pipeline))
+
+        return [
+            {"area_id": doc["_id"]["area_id"], "value": doc["_id"]["value"], "count": doc["count"]}
+            for doc in docs
+        ]
+
+    @staticmethod
+    def count_by_uf(field, ufs=None, values=None, area_ufs=None, hint=None):
+        """
+        Contagem de medições por UF e valor de field: {uf: {valor: quantidade}}.
+        A UF vem do join com Localization, não do nome da área; area_ufs evita
+        consultar novamente o mapa {area_id: uf} quando ele já foi carregado.
+        """
+        if area_ufs is None:
+            area_ufs = MeasurementCountService.area_uf_map(ufs) if ufs else MeasurementCountService.all_area_ufs()
+        if not area_ufs:
+            return {}
+
+        counts = {}
+        for doc in MeasurementCountService.count_by_area(
+                field, area_ufs.keys() if ufs else None, values, hint):
+            uf = area_ufs.get(doc["area_id"])
+            if uf is None or doc["value"] is None:
+                continue
+            uf_counts = counts.setdefault(uf, {})
+            uf_counts[doc["value"]] = uf_counts.get(doc["value"], 0) + doc["count"]
+        return counts
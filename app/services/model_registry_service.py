@@ -0,0 +1,189 @@
+# app/services/model_registry_service.py
+import os
+import re
+import time
+import threading
+from datetime import datetime
+
+import joblib
+
+from app.initializer import mongo
+from app.services.feature_encoder_service import OneHotEncoder
+
+ML_MODEL_DIR = os.getenv('ML_MODEL_DIR', '.')
+ML_MODEL_VERSION = os.getenv('ML_MODEL_VERSION', 'v2')
+# mmap_mode='r' deixa os arrays NumPy do modelo mapeados do arquivo: workers
+# criados por fork compartilham as mesmas páginas em vez de uma cópia cada
+ML_MODEL_MMAP = os.getenv('ML_MODEL_MMAP', 'true').lower() == 'true'
+# Intervalo para conferir no Mongo se outro processo trocou a versão ativa
+ML_MODEL_VERSION_CHECK_SECONDS = int(os.getenv('ML_MODEL_VERSION_CHECK_SECONDS', 30))
+
+MODEL_STATE_COLLECTION = "ml_model_state"
+VERSION_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class ModelArtifacts:
+    """
+    Conjunto imutável modelo + scaler + colunas + encoder de uma versão; uma
+    requisição usa sempre o mesmo conjunto, mesmo se houver troca no meio dela.
+    """
+
+    def __init__(self, version, model, scaler, columns, paths, load_ms):
+        self.version = version
+        self.model = model
+        self.scaler = scaler
+        self.columns = columns
+        self.encoder = OneHotEncoder(columns)
+        self.paths = paths
+        self.load_ms = load_ms
+        self.loaded_on = datetime.now()
+
+    def scale(self, matrix):
+        """
+        Aplica o scaler à matriz codificada, com os nomes das colunas quando o scaler
+        foi ajustado com eles (evita o aviso de features sem nome do scikit-learn).
+        """
+        if hasattr(self.scaler, "feature_names_in_"):
+            matrix = self.encoder.to_frame(matrix)
+        return self.scaler.transform(matrix)
+
+    def to_dict(self):
+        return {
+            "version": self.version,
+            "model_type": type(self.model).__name__,
+            "classes": [str(label) for label in getattr(self.model, "classes_", [])],
+            "n_features": self.encoder.n_features,
+            "paths": self.paths,
+            "load_ms": self.load_ms,
+            "loaded_on": self.loaded_on.isoformat()
+        }
+
+
+class ModelRegistry:
+    """
+    Carrega os artefatos do modelo sob demanda (no primeiro uso, não na importação
+    do blueprint) e permite trocar a versão ativa sem reiniciar a aplicação.
+    A versão ativa fica no Mongo para que todos os processos passem a usá-la.
+    """
+
+    def __init__(self, model_dir=ML_MODEL_DIR, default_version=ML_MODEL_VERSION, mmap=ML_MODEL_MMAP,
+                 check_seconds=ML_MODEL_VERSION_CHECK_SECONDS):
+        self.model_dir = model_dir
+        self.default_version = default_version
+        self.mmap = mmap
+        self.check_seconds = check_seconds
+        self._artifacts = None
+        self._checked_at = 0.0
+        self._load_lock = threading.Lock()
+
+    def paths(self, version):
+        """
+        Arquivos de uma versão: model_<v>.pkl, scaler_<v>.pkl e columns_used_<v>.pkl
+        (ou columns_used.pkl quando a versão não tem lista de colunas própria).
+        """
+        if not VERSION_PATTERN.match(version or ''):
+            raise ValueError(f"Invalid model version: {version!r}")
+
+        columns_path = os.path.join(self.model_dir, f'columns_used_{version}.pkl')
+        if not os.path.exists(columns_path):
+            columns_path = os.path.join(self.model_dir, 'columns_used.pkl')
+        return {
+            "model": os.path.join(self.model_dir, f'model_{version}.pkl'),
+            "scaler": os.path.join(self.model_dir, f'scaler_{version}.pkl'),
+            "columns": columns_path
+        }
+
+    def load(self, version):
+        """
+        Carrega e valida os artefatos de uma versão, sem ativá-la.
+        """
+        paths = self.paths(version)
+        missing = [path for path in paths.values() if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"Missing model artifacts: {', '.join(missing)}")
+
+        start = time.perf_counter()
+        mmap_mode = 'r' if self.mmap else None
+        model = joblib.load(paths["model"], mmap_mode=mmap_mode)
+        scaler = joblib.load(paths["scaler"], mmap_mode=mmap_mode)
+        columns = list(joblib.load(paths["columns"]))
+
+        for name, estimator in (("model", model), ("scaler", scaler)):
+            n_features = getattr(estimator, "n_features_in_", len(columns))
+            if n_features != len(columns):
+                raise ValueError(f"{name} expects {n_features} features but columns list has {len(columns)}")
+
+        return ModelArtifacts(version, model, scaler, columns, paths, round((time.perf_counter() - start) * 1000, 2))
+
+    def _active_version(self):
+        try:
+            state = mongo.db[MODEL_STATE_COLLECTION].find_one({"_id": "active"})
+        except Exception as e:
+            print(f'[WARN] Falha ao ler a versão ativa do modelo: {e}')
+            state = None
+        return state["version"] if state else self.default_version
+
+    def get(self):
+        """
+        Retorna os artefatos ativos, carregando-os no primeiro uso e seguindo trocas
+        de versão feitas por outros processos (conferidas a cada check_seconds).
+        """
+        artifacts = self._artifacts
+        if artifacts is not None and time.monotonic() - self._checked_at < self.check_seconds:
+            return artifacts
+
+        with self._load_lock:
+            artifacts = self._artifacts
+            if artifacts is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return artifacts
+
+            self._checked_at = time.monotonic()
+            version = self._active_version()
+            if artifacts is not None and artifacts.version == version:
+                return artifacts
+
+            try:
+                self._artifacts = self.load(version)
+            except Exception as e:
+                if artifacts is None and version != self.default_version:
+                    print(f'[WARN] Falha ao carregar o modelo {version}, usando {self.default_version}: {e}')
+                    self._artifacts = self.load(self.default_version)
+                elif artifacts is None:
+                    raise
+                else:
+                    print(f'[WARN] Falha ao carregar o modelo {version}, mantendo {artifacts.version}: {e}')
+            return self._artifacts
+
+    def swap(self, version):
+        """
+        Carrega a versão informada e a torna ativa neste processo (troca atômica da
+        referência) e, via Mongo, nos demais. Requisições em andamento terminam com
+        os artefatos anteriores. Retorna (novos artefatos, versão anterior).
+        """
+        artifacts = self.load(version)
+        with self._load_lock:
+            previous = self._artifacts
+            self._artifacts = artifacts
+            self._checked_at = time.monotonic()
+
+        mongo.db[MODEL_STATE_COLLECTION].replace_one(
+            {"_id": "active"},
+            {"_id": "active", "version": version, "updated_on": datetime.now()},
+            upsert=True
+        )
+        return artifacts, previous.version if previous else None
+
+    def info(self):
+        """
+        Estado do registro sem forçar o carregamento do modelo.
+        """
+        artifacts = self._artifacts
+        return {
+            "loaded": artifacts is not None,
+            "default_version": self.default_version,
+            "mmap": self.mmap,
+            "active": artifacts.to_dict() if artifacts else None
+        }
+
+
+model_registry = ModelRegistry()
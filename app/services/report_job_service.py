@@ -0,0 +1,187 @@
+# app/services/report_job_service.py
+import os
+import uuid
+import multiprocessing
+from datetime import datetime
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.initializer import app, mongo
+from app.services.report_service import ReportService, report_store
+from app.services.report_worker import run_report_job
+from app.util.utils import process_owner, owner_is_gone
+
+REPORT_WORKERS = int(os.getenv('REPORT_WORKERS', 2))
+# 'spawn' evita herdar conexões e threads do processo da API nos workers de renderização
+REPORT_MP_START_METHOD = os.getenv('REPORT_MP_START_METHOD', 'spawn')
+
+
+class ReportJobService:
+    """
+    Gera relatórios em segundo plano: os dados são carregados na requisição, a
+    renderização (gráficos + PDF) roda em um pool de processos e o PDF fica no
+    report_store, com o mesmo nome do cache de GET /report/<area_id> (área +
+    fingerprint dos dados). O status dos jobs é guardado na coleção report_jobs do Mongo.
+    """
+    _executor = None
+    _pid = None
+
+    @staticmethod
+    def _get_executor(reset=False):
+        # Pools de processos não sobrevivem a um fork; recria por processo (ou se um worker morreu)
+        if reset or ReportJobService._executor is None or ReportJobService._pid != os.getpid():
+            ReportJobService._executor = ProcessPoolExecutor(
+                max_workers=REPORT_WORKERS, mp_context=multiprocessing.get_context(REPORT_MP_START_METHOD)
+            )
+            ReportJobService._pid = os.getpid()
+        return ReportJobService._executor
+
+    @staticmethod
+    def _insert(job_id, area_id, name, company_id, user_id, **fields):
+        now = datetime.now()
+        mongo.db.report_jobs.insert_one({
+            "_id": job_id,
+            "area_id": area_id,
+            "file": name,
+            "company_id": company_id,
+            "user_id": user_id,
+            **process_owner(),
+            "state": "queued",
+            "measurements": None,
+            "size_bytes": None,
+            "error": None,
+            "created_on": now,
+            "started_on": None,
+            "finished_on": None,
+            **fields
+        })
+
+    @staticmethod
+    def submit_cached(area_id, name, company_id=None, user_id=None):
+        """
+        Registra como já concluído um job cujo PDF (name) já está no report_store.
+        Retorna o id do job, ou None se o arquivo não estiver mais lá.
+        """
+        path = report_store.get(name)
+        if path is None:
+            return None
+
+        job_id = uuid.uuid4().hex
+        now = datetime.now()
+        ReportJobService._insert(
+            job_id, area_id, name, company_id, user_id,
+            state="done", size_bytes=os.path.getsize(path), started_on=now, finished_on=now
+        )
+        return job_id
+
+    @staticmethod
+    def submit(area_id, name, records, company_id=None, user_id=None):
+        """
+        Registra o job e agenda a renderização dos registros já carregados no arquivo
+        name do report_store. Retorna o id do job.
+        """
+        job_id = uuid.uuid4().hex
+        ReportJobService._insert(job_id, area_id, name, company_id, user_id, measurements=len(records))
+
+        args = (run_report_job, job_id, records, report_store.path_for(name), app.config["MONGO_URI"])
+        try:
+            future = ReportJobService._get_executor().submit(*args)
+        except BrokenProcessPool:
+            future = ReportJobService._get_executor(reset=True).submit(*args)
+
+        future.add_done_callback(partial(ReportJobService._finish, job_id, name))
+        return job_id
+
+    @staticmethod
+    def _finish(job_id, name, future):
+        with app.app_context():
+            try:
+                ReportJobService._record_result(job_id, name, future)
+            except Exception as e:
+                print(f'[WARN] Falha ao registrar o resultado do relatório {job_id}: {e}')
+
+    @staticmethod
+    def _record_result(job_id, name, future):
+        jobs = mongo.db.report_jobs
+        error = future.exception()
+        if error is not None:
+            jobs.update_one({"_id": job_id}, {"$set": {
+                "state": "failed",
+                "error": str(error),
+                "finished_on": datetime.now()
+            }})
+            return
+
+        jobs.update_one({"_id": job_id}, {"$set": {
+            "state": "done",
+            "size_bytes": os.path.getsize(future.result()),
+            "finished_on": datetime.now()
+        }})
+
+        ReportService.evict(keep=name)
+
+    @staticmethod
+    def recover_interrupted():
+        """
+        Marca como falhos os jobs queued/running cujo processo não existe mais (reinício
+        ou queda da API). Retorna a quantidade.
+        """
+        jobs = mongo.db.report_jobs
+        recovered = 0
+        for job in jobs.find({"state": {"$in": ["queued", "running"]}}, {"host": 1, "pid": 1}):
+            if not owner_is_gone(job):
+                continue
+
+            result = jobs.update_one({"_id": job["_id"], "state": {"$in": ["queued", "running"]}}, {"$set": {
+                "state": "failed",
+                "error": "Report interrupted by an API restart, queue it again",
+                "finished_on": datetime.now()
+            }})
+            recovered += result.modified_count
+        return recovered
+
+    @staticmethod
+    def _visible_to(job, company_id, user_id):
+        # Mesma empresa do token; sem empresa, apenas o próprio usuário que criou o job
+        if job.get("company_id") != company_id:
+            return False
+        return company_id is not None or (user_id is not None and job.get("user_id") == user_id)
+
+    @staticmethod
+    def _find(job_id, company_id, user_id):
+        job = mongo.db.report_jobs.find_one({"_id": job_id})
+        if not job or not ReportJobService._visible_to(job, company_id, user_id):
+            return None
+        return job
+
+    @staticmethod
+    def get(job_id, company_id, user_id=None):
+        """
+        Retorna o job (ou None se não existir ou não for visível para a empresa/usuário).
+        """
+        job = ReportJobService._find(job_id, company_id, user_id)
+        if job is None:
+            return None
+
+        return {
+            "id": job["_id"],
+            "area_id": job["area_id"],
+            "state": job["state"],
+            "measurements": job.get("measurements"),
+            "size_bytes": job.get("size_bytes"),
+            "error": job.get("error"),
+            "created_on": job["created_on"].isoformat(),
+            "started_on": job["started_on"].isoformat() if job.get("started_on") else None,
+            "finished_on": job["finished_on"].isoformat() if job.get("finished_on") else None
+        }
+
+    @staticmethod
+    def file_path(job_id, company_id, user_id=None):
+        """
+        Caminho do PDF de um job concluído, ou None se ele já saiu do report_store.
+        """
+        job = ReportJobService._find(job_id, company_id, user_id)
+        if job is None:
+            return None
+        return report_store.get(job.get("file", job_id))
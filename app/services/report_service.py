@@ -0,0 +1,202 @@
+# app/services/report_service.py
+import os
+import glob
+import hashlib
+import tempfile
+import threading
+
+import pandas as pd
+
+from app.database import db
+from app.initializer import mongo
+from app.models import Area, Localization
+from app.util.report_render import REPORT_TEMPLATE_FINGERPRINT
+
+REPORT_COLUMNS = [
+    "area_name",
+    # "uf",
+    # "city",
+    "planting_techniques",
+    "planted_species",
+    "total_area_hectares",
+    "initial_planted_area_hectares",
+    "initial_vegetation_cover",
+    "soil_fertility_index_percent",
+    "avoided_co2_emissions_cubic_meters",
+    "number_of_trees_lost",
+    "tree_health_status",
+    "average_tree_growth_cm",
+    "water_sources",
+    "water_quality_indicators",
+    "pest_management",
+    "fertilization",
+    "irrigation",
+    "environmental_threats",
+    # "total_project_cost_brl",
+    # "funding_source",
+    "stage_indicator",
+    "measurement_date",
+    "living_trees_to_date",
+    "tree_survival_rate"
+]
+
+# Colunas do relatório que vêm das medições no Mongo (as demais vêm da área no Postgres)
+REPORT_MEASUREMENT_FIELDS = [column for column in REPORT_COLUMNS if column not in (
+    "area_name", "planting_techniques", "planted_species", "total_area_hectares",
+    "initial_planted_area_hectares", "initial_vegetation_cover"
+)]
+
+REPORT_STORE_PATH = os.getenv(
+    'REPORT_STORE_PATH',
+    os.path.join(os.getenv('TEMPORARY_FOLDER_PATH') or tempfile.gettempdir(), 'reports')
+)
+REPORT_STORE_MAX_BYTES = int(os.getenv('REPORT_STORE_MAX_BYTES', 200 * 1024 * 1024))
+
+
+class ReportStore:
+    """
+    Diretório de PDFs gerados limitado em bytes. Cada leitura atualiza o mtime do
+    arquivo; ao passar do limite os arquivos usados há mais tempo são removidos.
+    """
+
+    def __init__(self, path=REPORT_STORE_PATH, max_bytes=REPORT_STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path_for(self, name):
+        return os.path.join(self.path, f'{name}.pdf')
+
+    def get(self, name):
+        """
+        Caminho do PDF guardado com esse nome (marcando-o como usado agora), ou None.
+        """
+        path = self.path_for(name)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def _files(self):
+        files = []
+        for path in glob.glob(os.path.join(self.path, '*.pdf')):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def evict(self, keep=None):
+        """
+        Remove os PDFs menos usados até o diretório caber em max_bytes (nunca remove keep).
+        Retorna os nomes removidos.
+        """
+        removed = []
+        with self._lock:
+            files = sorted(self._files())
+            total = sum(size for _, size, _ in files)
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                name = os.path.basename(path)[:-len('.pdf')]
+                if name == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                removed.append(name)
+        return removed
+
+    def stats(self):
+        files = self._files()
+        return {
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "files": len(files),
+            "bytes": sum(size for _, size, _ in files)
+        }
+
+
+report_store = ReportStore()
+
+
+class ReportService:
+
+    @staticmethod
+    def fingerprint(area_id):
+        """
+        Identifica a versão dos dados de entrada do relatório de uma área: updated_on
+        da área, quantidade e data da última medição e versão do template. Duas
+        chamadas com o mesmo valor geram o mesmo PDF. Retorna None se a área não existir.
+        """
+        area = db.session.query(Area.id, Area.updated_on).filter(Area.id == area_id).first()
+        if area is None:
+            return None
+
+        # Ambas as consultas usam o índice area_id_measurement_date sem ler os documentos
+        count = mongo.db.api.count_documents({"area_id": area_id})
+        latest = mongo.db.api.find_one(
+            {"area_id": area_id}, {"_id": 0, "measurement_date": 1}, sort=[("measurement_date", -1)]
+        )
+
+        parts = [
+            str(area_id),
+            area.updated_on.isoformat() if area.updated_on else '',
+            str(count),
+            str(latest["measurement_date"]) if latest and latest.get("measurement_date") else '',
+            REPORT_TEMPLATE_FINGERPRINT
+        ]
+        return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+    @staticmethod
+    def cache_name(area_id, fingerprint):
+        return f'area-{area_id}-{fingerprint}'
+
+    @staticmethod
+    def evict(keep=None):
+        """
+        Aplica o limite do report_store (ver ReportStore.evict) e marca como expired
+        os jobs concluídos cujo PDF foi removido. Toda remoção de PDFs deve passar por aqui.
+        """
+        evicted = report_store.evict(keep=keep)
+        if evicted:
+            mongo.db.report_jobs.update_many(
+                {"file": {"$in": evicted}, "state": "done"}, {"$set": {"state": "expired"}}
+            )
+        return evicted
+
+    @staticmethod
+    def load_data(area_id):
+        """
+        Carrega a área (Postgres) e suas medições (Mongo) no formato usado pelo
+        relatório: lista de dicts com REPORT_COLUMNS. Retorna [] se não houver dados.
+        """
+        sql_query = db.session.query(
+            (Area.id).label('areaid'), Area.area_name, Area.planting_techniques, Area.planted_species,
+            Area.total_area_hectares, Area.initial_planted_area_hectares, Area.initial_vegetation_cover,
+            Localization.uf, Localization.city
+        ).join(Localization).filter(
+            Area.id == area_id
+        ).all()
+
+        if not sql_query:
+            return []
+
+        pipeline = [
+            {"$match": {"area_id": area_id}},
+            {"$project": {"_id": 0, "area_id": 1, **{field: 1 for field in REPORT_MEASUREMENT_FIELDS}}}
+        ]
+        df_mg = pd.DataFrame(list(mongo.db.api.aggregate(pipeline)))
+        if df_mg.empty:
+            return []
+
+        df_pg = pd.DataFrame(sql_query)
+        df_merged = pd.merge(df_pg, df_mg, left_on='areaid', right_on='area_id', how='inner')
+        df_merged = df_merged.reindex(columns=REPORT_COLUMNS)
+        df_merged["measurement_date"] = pd.to_datetime(df_merged["measurement_date"]).dt.strftime("%Y-%m-%d")
+
+        return df_merged.to_dict(orient='records')
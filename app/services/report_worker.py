@@ -0,0 +1,33 @@
+# app/services/report_worker.py
+# Executado nos processos do pool de relatórios: não importa o app Flask (que
+# inicializaria bancos, blueprints etc. em cada worker), só o pymongo e o render.
+from datetime import datetime
+
+from pymongo import MongoClient
+
+from app.util.report_render import render_report_pdf
+
+_client = None
+
+
+def _jobs(mongo_uri):
+    global _client
+    if _client is None:
+        _client = MongoClient(mongo_uri)
+    return _client.get_default_database().report_jobs
+
+
+def run_report_job(job_id, records, output_path, mongo_uri):
+    """
+    Marca o job como running no Mongo (visível para todos os workers da API) e
+    renderiza o PDF. Retorna output_path.
+    """
+    try:
+        _jobs(mongo_uri).update_one(
+            {"_id": job_id, "state": "queued"},
+            {"$set": {"state": "running", "started_on": datetime.now()}}
+        )
+    except Exception as e:
+        print(f'[WARN] Falha ao marcar o relatório {job_id} como running: {e}')
+
+    return render_report_pdf(records, output_path)
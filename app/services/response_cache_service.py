@@ -0,0 +1,177 @@
+# app/services/response_cache_service.py
+import os
+import time
+import threading
+from functools import wraps
+
+from cachetools import TTLCache
+from flask import Response, current_app, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from pymongo import ReturnDocument
+
+from app.initializer import mongo
+
+RESPONSE_CACHE_MAX_SIZE = int(os.getenv('RESPONSE_CACHE_MAX_SIZE', 512))
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv('RESPONSE_CACHE_TTL_SECONDS', 600))
+# Intervalo para conferir no Mongo se outro processo mudou a versão dos dados
+RESPONSE_CACHE_VERSION_CHECK_SECONDS = float(os.getenv('RESPONSE_CACHE_VERSION_CHECK_SECONDS', 5))
+
+DATA_VERSION_COLLECTION = "data_version"
+DATA_VERSION_ID = "data"
+
+
+class ResponseCache:
+    """
+    Cache LRU com TTL para respostas de endpoints de agregação.
+    A chave combina endpoint, query string normalizada, empresa do usuário e a versão
+    dos dados; bump() muda a versão sempre que áreas ou medições são gravadas.
+    A versão é um contador no Mongo, para que uma gravação em um processo invalide
+    os caches de todos (conferido a cada version_check_seconds).
+    """
+
+    def __init__(self, maxsize=RESPONSE_CACHE_MAX_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS,
+                 version_check_seconds=RESPONSE_CACHE_VERSION_CHECK_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_check_seconds = version_check_seconds
+        self._cache = TTLCache(maxsize=max(maxsize, 1), ttl=ttl)
+        self._lock = threading.Lock()
+        self._shared_version = None
+        # Invalidações locais quando o Mongo não pôde ser atualizado
+        self._local_bumps = 0
+        self._checked_at = 0.0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _normalize_args(args):
+        """
+        Query string como tupla ordenada, ignorando parâmetros vazios.
+        """
+        return tuple(sorted(
+            (name, tuple(sorted(value.strip() for value in values if value.strip())))
+            for name, values in args.lists()
+            if any(value.strip() for value in values)
+        ))
+
+    @staticmethod
+    def _company_id():
+        """
+        Empresa do token; endpoints públicos sem token (ou com token inválido) usam None.
+        """
+        try:
+            verify_jwt_in_request(optional=True)
+            return get_jwt().get('company_id')
+        except Exception:
+            return None
+
+    def cached(self, view):
+        """
+        Decorator para as views: respostas 200 ficam em cache até o TTL ou o próximo bump().
+        Deve ficar abaixo de @jwt_required() para que a autenticação rode antes do cache.
+        """
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if self.maxsize <= 0:
+                return view(*args, **kwargs)
+
+            version = self.version
+            key = (version, request.endpoint, tuple(sorted(kwargs.items())),
+                   self._normalize_args(request.args), self._company_id())
+
+            with self._lock:
+                entry = self._cache.get(key)
+                if entry is not None:
+                    self._hits += 1
+                else:
+                    self._misses += 1
+
+            if entry is not None:
+                body, status, mimetype = entry
+                response = Response(body, status=status, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                with self._lock:
+                    # Uma resposta calculada antes de um bump() fica com a chave da versão antiga
+                    if version == (self._shared_version, self._local_bumps):
+                        self._cache[key] = (response.get_data(), response.status_code, response.mimetype)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+
+        return wrapper
+
+    def _refresh_version(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.version_check_seconds:
+            return
+
+        try:
+            state = mongo.db[DATA_VERSION_COLLECTION].find_one({"_id": DATA_VERSION_ID})
+            shared_version = state["version"] if state else 0
+        except Exception as e:
+            print(f'[WARN] Falha ao ler a versão dos dados: {e}')
+            shared_version = self._shared_version
+
+        with self._lock:
+            self._checked_at = now
+            if shared_version != self._shared_version:
+                if self._shared_version is not None:
+                    self._invalidations += 1
+                self._shared_version = shared_version
+                self._cache.clear()
+
+    @property
+    def version(self):
+        """
+        Versão atual dos dados (compartilhada entre processos); outros caches em memória
+        podem usá-la como chave de invalidação.
+        """
+        self._refresh_version()
+        with self._lock:
+            return self._shared_version, self._local_bumps
+
+    def bump(self):
+        """
+        Invalida as respostas em cache de todos os processos (chamado após gravações em áreas ou medições).
+        """
+        try:
+            state = mongo.db[DATA_VERSION_COLLECTION].find_one_and_update(
+                {"_id": DATA_VERSION_ID}, {"$inc": {"version": 1}},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+            shared_version = state["version"]
+        except Exception as e:
+            # Sem o Mongo, invalida ao menos este processo
+            print(f'[WARN] Falha ao atualizar a versão dos dados: {e}')
+            shared_version = None
+
+        with self._lock:
+            if shared_version is not None:
+                self._shared_version = shared_version
+                self._checked_at = time.monotonic()
+            else:
+                self._local_bumps += 1
+            self._invalidations += 1
+            self._cache.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                'max_size': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'entries': len(self._cache),
+                'version': self._shared_version,
+                'version_check_seconds': self.version_check_seconds,
+                'hits': self._hits,
+                'misses': self._misses,
+                'hit_rate': round(self._hits / total, 4) if total else 0.0,
+                'invalidations': self._invalidations
+            }
+
+
+response_cache = ResponseCache()
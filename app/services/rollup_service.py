@@ -0,0 +1,209 @@
+# app/services/rollup_service.py
+import os
+import time
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from app.initializer import mongo
+from app.util.utils import process_owner, owner_is_gone
+
+# Campos numéricos somados por (área, mês)
+ROLLUP_SUM_FIELDS = [
+    "avoided_co2_emissions_cubic_meters",
+    "number_of_trees_lost",
+    "living_trees_to_date",
+    "soil_fertility_index_percent",
+    "average_tree_growth_cm",
+    "tree_survival_rate",
+    "total_project_cost_brl",
+]
+
+# Campos guardados da primeira e da última medição do mês
+ROLLUP_STATE_FIELDS = [
+    "measurement_date",
+    "tree_health_status",
+    "environmental_threats",
+    "stage_indicator",
+    "fertilization",
+    "water_quality_indicators",
+    "funding_source",
+]
+
+ROLLUP_COLLECTION = "api_monthly"
+ROLLUP_STATE_COLLECTION = "rollup_state"
+# Enquanto o rollup não foi construído, intervalo para conferir de novo no Mongo
+ROLLUP_READY_CHECK_SECONDS = int(os.getenv('ROLLUP_READY_CHECK_SECONDS', 30))
+# Tempo após o qual uma construção iniciada e não concluída é considerada abandonada
+ROLLUP_BUILD_TIMEOUT_SECONDS = int(os.getenv('ROLLUP_BUILD_TIMEOUT_SECONDS', 3600))
+
+
+class RollupService:
+    """
+    Mantém a coleção api_monthly: um documento por (area_id, mês) com somas,
+    contagem e primeira/última medição, usado pelos gráficos do dashboard.
+    Os gráficos só leem o rollup depois que ele foi construído por completo (rebuild);
+    até lá usam as medições brutas.
+    """
+    _ready = False
+    _checked_at = 0.0
+
+    @staticmethod
+    def _pipeline(match):
+        state = {field: f"${field}" for field in ROLLUP_STATE_FIELDS}
+        sums = {f"sum_{field}": {"$sum": f"${field}"} for field in ROLLUP_SUM_FIELDS}
+
+        return [
+            {"$match": match},
+            # 1. Agrupa por área, mês e adubação (necessário para a média de fertilidade por adubação)
+            {"$group": {
+                "_id": {
+                    "area_id": "$area_id",
+                    "month": {"$dateTrunc": {"date": "$measurement_date", "unit": "month"}},
+                    "fertilization": "$fertilization"
+                },
+                "count": {"$sum": 1},
+                "soil_fertility_count": {
+                    "$sum": {"$cond": [{"$isNumber": "$soil_fertility_index_percent"}, 1, 0]}
+                },
+                **sums,
+                "first": {"$top": {"sortBy": {"measurement_date": 1}, "output": state}},
+                "last": {"$bottom": {"sortBy": {"measurement_date": 1}, "output": state}},
+            }},
+            # 2. Consolida por área e mês
+            {"$group": {
+                "_id": {"area_id": "$_id.area_id", "month": "$_id.month"},
+                "count": {"$sum": "$count"},
+                **{name: {"$sum": f"${name}"} for name in sums},
+                "first": {"$top": {"sortBy": {"first.measurement_date": 1}, "output": "$first"}},
+                "last": {"$bottom": {"sortBy": {"last.measurement_date": 1}, "output": "$last"}},
+                "fertilization": {"$push": {
+                    "value": "$_id.fertilization",
+                    "soil_fertility_count": "$soil_fertility_count",
+                    "sum_soil_fertility_index_percent": "$sum_soil_fertility_index_percent"
+                }},
+            }},
+            {"$project": {
+                "area_id": "$_id.area_id",
+                "month": "$_id.month",
+                "year_month": {"$dateToString": {"format": "%Y-%m", "date": "$_id.month"}},
+                "count": 1,
+                "sums": {field: f"$sum_{field}" for field in ROLLUP_SUM_FIELDS},
+                "first": 1,
+                "last": 1,
+                "fertilization": 1,
+                "updated_on": "$$NOW",
+            }},
+        ]
+
+    @staticmethod
+    def refresh(area_ids, start_date, end_date):
+        """
+        Recalcula o rollup das áreas informadas nos meses entre start_date e end_date (inclusive).
+        """
+        if not area_ids:
+            return
+
+        month_start = datetime(start_date.year, start_date.month, 1)
+        month_end = datetime(end_date.year + end_date.month // 12, end_date.month % 12 + 1, 1)
+
+        pipeline = RollupService._pipeline({
+            "area_id": {"$in": list(area_ids)},
+            "measurement_date": {"$gte": month_start, "$lt": month_end}
+        })
+        pipeline.append({
+            "$merge": {"into": ROLLUP_COLLECTION, "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}
+        })
+        mongo.db.api.aggregate(pipeline)
+
+    @staticmethod
+    def refresh_for(documents):
+        """
+        Atualiza o rollup a partir das medições recém gravadas.
+        """
+        documents = [
+            doc for doc in documents
+            if doc.get("area_id") is not None and isinstance(doc.get("measurement_date"), datetime)
+        ]
+        if not documents:
+            return
+
+        dates = [doc["measurement_date"] for doc in documents]
+        RollupService.refresh({doc["area_id"] for doc in documents}, min(dates), max(dates))
+
+    @staticmethod
+    def rebuild():
+        """
+        Reconstrói todo o rollup a partir da coleção de medições.
+        """
+        pipeline = RollupService._pipeline({"area_id": {"$ne": None}, "measurement_date": {"$type": "date"}})
+        pipeline.append({"$out": ROLLUP_COLLECTION})
+        mongo.db.api.aggregate(pipeline)
+        mongo.db[ROLLUP_STATE_COLLECTION].update_one(
+            {"_id": ROLLUP_COLLECTION}, {"$set": {"built_on": datetime.now()}}, upsert=True
+        )
+        RollupService._ready = True
+        return mongo.db[ROLLUP_COLLECTION].estimated_document_count()
+
+    @staticmethod
+    def is_ready():
+        """
+        Indica se o rollup já foi construído (e pode substituir as medições brutas).
+        """
+        if RollupService._ready:
+            return True
+        if time.monotonic() - RollupService._checked_at < ROLLUP_READY_CHECK_SECONDS:
+            return False
+
+        RollupService._checked_at = time.monotonic()
+        state = mongo.db[ROLLUP_STATE_COLLECTION].find_one({"_id": ROLLUP_COLLECTION})
+        RollupService._ready = bool(state and state.get("built_on"))
+        return RollupService._ready
+
+    @staticmethod
+    def _acquire_build_lock():
+        # Documento de estado sem built_on = construção em andamento, com o processo dono
+        state = mongo.db[ROLLUP_STATE_COLLECTION]
+        lock = {"_id": ROLLUP_COLLECTION, "built_on": None, "started_on": datetime.now(), **process_owner()}
+        try:
+            state.insert_one(lock)
+            return True
+        except DuplicateKeyError:
+            pass
+
+        current = state.find_one({"_id": ROLLUP_COLLECTION})
+        if current is None or current.get("built_on"):
+            return False
+
+        # Assume a construção se o processo dono morreu (reinício no meio do build) ou passou do tempo limite
+        started_on = current.get("started_on")
+        expired = started_on is None or started_on < datetime.now() - timedelta(seconds=ROLLUP_BUILD_TIMEOUT_SECONDS)
+        if not (expired or owner_is_gone(current)):
+            return False
+
+        result = state.update_one(
+            {"_id": ROLLUP_COLLECTION, "built_on": None, "started_on": started_on},
+            {"$set": {key: value for key, value in lock.items() if key != "_id"}}
+        )
+        return result.modified_count == 1
+
+    @staticmethod
+    def ensure_built():
+        """
+        Constrói o rollup se ele ainda não existe (ex.: primeira subida após a atualização).
+        Só um processo executa; os demais seguem usando as medições brutas até terminar.
+        Uma construção interrompida (processo encerrado ou acima de ROLLUP_BUILD_TIMEOUT_SECONDS)
+        é retomada. Retorna True se o rollup foi construído por esta chamada.
+        """
+        if RollupService.is_ready():
+            return False
+        if not RollupService._acquire_build_lock():
+            # Outro processo já está construindo (ou construiu) o rollup
+            return False
+
+        try:
+            RollupService.rebuild()
+        except Exception:
+            mongo.db[ROLLUP_STATE_COLLECTION].delete_one({"_id": ROLLUP_COLLECTION, "built_on": None})
+            raise
+        return True
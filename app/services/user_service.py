@@ -1,31 +1,44 @@
 # app/services/user_service.py
+import threading
 
 from app.models.user import User
 from app.database import db
-from app.services.encryption_service import EncryptionService
-from app.database.sqlite import get_sqlite_session
+from app.services.encryption_service import EncryptionService, RSA_FIELD_VERSION, ENVELOPE_VERSION
+from app.database.sqlite import user_key_store
+from app.services.key_management_service import KeyManagementService
+from app.services.key_pool_service import key_pair_pool
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+PII_FIELDS = ('first_name', 'last_name', 'email')
 
 class UserService:
+    # Até o backfill de inicialização terminar neste processo pode haver usuários sem email_index
+    _unindexed_users = True
+    # Uma busca sem índice por vez: cada uma descriptografa todos os registros sem índice
+    _unindexed_lock = threading.Lock()
+
     @staticmethod
     def create_user(first_name, last_name, email, password, cargo, company_id):
         """
         Cria um novo usuário, criptografa dados sensíveis e salva chave no SQLite.
         """
 
-        # 1. Gerar chave pública e privada
-        private_key_pem, public_key_pem = EncryptionService.generate_keys()
+        # 1. Obter chave pública e privada do pool (gera na hora se estiver vazio)
+        private_key_pem, public_key_pem = key_pair_pool.acquire()
 
-        # 2. Criptografar dados sensíveis usando a chave pública
-        encrypted_first_name = EncryptionService.encrypt(public_key_pem, first_name)
-        encrypted_last_name = EncryptionService.encrypt(public_key_pem, last_name)
-        encrypted_email = EncryptionService.encrypt(public_key_pem, email)
+        # 2. Criptografar dados sensíveis no envelope protegido pela chave pública
+        encrypted_fields = UserService.encrypt_fields(public_key_pem, {
+            'first_name': first_name,
+            'last_name': last_name,
+            'email': email
+        })
+        email_index = EncryptionService.blind_index(email)
 
         # 3. Criar novo usuário
         new_user = User(
-            first_name=encrypted_first_name,
-            last_name=encrypted_last_name,
-            email=encrypted_email,
+            **encrypted_fields,
+            email_index=email_index,
             password=password,  # A senha já deve estar com bcrypt no controller
             cargo=cargo,
             company_id=company_id
@@ -36,13 +49,7 @@ class UserService:
             db.session.commit()
 
             # 4. Salvar a chave privada no SQLite
-            sqlite_session = get_sqlite_session()
-            sqlite_session.execute(
-                "INSERT INTO user_keys (user_id, private_key) VALUES (?, ?)",
-                (new_user.id, private_key_pem)
-            )
-            sqlite_session.commit()
-            sqlite_session.close()
+            user_key_store.put(new_user.id, private_key_pem)
 
             return new_user
         except SQLAlchemyError as e:
@@ -62,15 +69,238 @@ class UserService:
             db.session.delete(user)
             db.session.commit()
 
-            sqlite_session = get_sqlite_session()
-            sqlite_session.execute(
-                "DELETE FROM user_keys WHERE user_id = ?",
-                (user_id,)
-            )
-            sqlite_session.commit()
-            sqlite_session.close()
+            user_key_store.delete(user_id)
+            KeyManagementService.invalidate(user_id)
 
             return True
         except SQLAlchemyError as e:
             db.session.rollback()
             raise e
+
+    @staticmethod
+    def encrypt_fields(public_key, values):
+        """
+        Sela os campos pessoais com uma chave AES-GCM própria do usuário, protegida
+        uma única vez pela chave pública RSA. Retorna os valores das colunas do User.
+        """
+        data_key = EncryptionService.generate_data_key()
+        encrypted = {
+            field: EncryptionService.seal(data_key, values[field], field)
+            for field in PII_FIELDS
+        }
+        encrypted['data_key'] = EncryptionService.wrap_data_key(public_key, data_key)
+        encrypted['encryption_version'] = ENVELOPE_VERSION
+        return encrypted
+
+    @staticmethod
+    def decrypt_fields(user, private_key):
+        """
+        Descriptografa os campos pessoais do usuário conforme a versão do registro.
+        """
+        if user.encryption_version == ENVELOPE_VERSION:
+            data_key = EncryptionService.unwrap_data_key(private_key, user.data_key)
+            return {
+                field: EncryptionService.unseal(data_key, getattr(user, field), field)
+                for field in PII_FIELDS
+            }
+
+        return {
+            field: EncryptionService.decrypt(private_key, getattr(user, field))
+            for field in PII_FIELDS
+        }
+
+    @staticmethod
+    def upgrade_encryption(user, private_key, values):
+        """
+        Migra um registro no formato antigo (RSA por campo) para o envelope,
+        reaproveitando os valores já descriptografados. Não faz commit.
+        Retorna True se o registro foi alterado.
+        """
+        if (user.encryption_version or RSA_FIELD_VERSION) >= ENVELOPE_VERSION:
+            return False
+
+        if isinstance(private_key, bytes):
+            private_key = EncryptionService.load_private_key(private_key)
+
+        for column, value in UserService.encrypt_fields(private_key.public_key(), values).items():
+            setattr(user, column, value)
+        return True
+
+    @staticmethod
+    def upgrade_on_login(user, private_key, values):
+        """
+        Migração oportunista no login: regrava no envelope o registro ainda no formato
+        antigo, em uma sessão própria (a sessão da requisição não é commitada).
+        Falhas apenas geram aviso; o registro é migrado em um próximo login.
+        Retorna True se o registro foi migrado.
+        """
+        if (user.encryption_version or RSA_FIELD_VERSION) >= ENVELOPE_VERSION:
+            return False
+
+        with Session(db.engine) as session:
+            try:
+                stored = session.get(User, user.id)
+                upgraded = stored is not None and UserService.upgrade_encryption(stored, private_key, values)
+                session.commit()
+                return upgraded
+            except Exception as e:
+                session.rollback()
+                print(f"[WARN] Falha ao migrar a criptografia do usuário ID {user.id}: {e}")
+                return False
+
+    @staticmethod
+    def decrypt_users(users, private_keys):
+        """
+        Descriptografa uma lista de usuários (sem alterar os registros; a migração para
+        o envelope é feita no login e por 'flask users upgrade-encryption').
+        Retorna [(user, valores)] apenas para os usuários descriptografados com sucesso.
+        """
+        decrypted = []
+
+        for user in users:
+            private_key = private_keys.get(user.id)
+            if private_key is None:
+                continue
+
+            try:
+                values = UserService.decrypt_fields(user, private_key)
+            except Exception as e:
+                print(f"[WARN] Falha ao descriptografar usuário ID {user.id}: {e}")
+                continue
+
+            decrypted.append((user, values))
+
+        return decrypted
+
+    @staticmethod
+    def upgrade_all_encryption(batch_size=500):
+        """
+        Migra para o envelope todos os usuários ainda no formato antigo (RSA por campo).
+        Retorna a quantidade de usuários migrados.
+        """
+        updated = 0
+        last_id = 0
+
+        try:
+            while True:
+                users = User.query.filter(
+                    db.or_(User.encryption_version.is_(None), User.encryption_version < ENVELOPE_VERSION),
+                    User.id > last_id
+                ).order_by(User.id).limit(batch_size).all()
+                if not users:
+                    break
+
+                last_id = users[-1].id
+                private_keys = KeyManagementService.get_private_keys([user.id for user in users])
+
+                for user, values in UserService.decrypt_users(users, private_keys):
+                    if UserService.upgrade_encryption(user, private_keys[user.id], values):
+                        updated += 1
+
+                db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise e
+
+        return updated
+
+    @staticmethod
+    def find_by_email(email):
+        """
+        Localiza o usuário pelo índice cego do e-mail, sem descriptografar a tabela.
+        Enquanto o backfill de inicialização não termina, usuários anteriores à coluna
+        email_index são procurados da forma antiga e têm o índice gravado quando encontrados.
+        """
+        email_index = EncryptionService.blind_index(email)
+        user = User.query.filter_by(email_index=email_index).first()
+        if user or not UserService._unindexed_users:
+            return user
+        with UserService._unindexed_lock:
+            return UserService._find_unindexed_by_email(email, email_index)
+
+    @staticmethod
+    def _find_unindexed_by_email(email, email_index, batch_size=500):
+        last_id = 0
+        while True:
+            users = User.query.filter(User.email_index.is_(None), User.id > last_id) \
+                .order_by(User.id).limit(batch_size).all()
+            if not users:
+                return None
+
+            last_id = users[-1].id
+            private_keys = KeyManagementService.get_private_keys([user.id for user in users])
+
+            for user in users:
+                private_key = private_keys.get(user.id)
+                if private_key is None:
+                    continue
+
+                try:
+                    values = UserService.decrypt_fields(user, private_key)
+                except Exception as e:
+                    print(f"[WARN] Falha ao descriptografar usuário ID {user.id}: {e}")
+                    continue
+
+                if values['email'] != email:
+                    continue
+
+                try:
+                    user.email_index = email_index
+                    db.session.commit()
+                except SQLAlchemyError as e:
+                    db.session.rollback()
+                    print(f"[WARN] Falha ao gravar o índice de e-mail do usuário ID {user.id}: {e}")
+                return user
+
+    @staticmethod
+    def ensure_email_index():
+        """
+        Executado na inicialização: preenche o índice cego dos usuários que ainda não o
+        têm e desliga, neste processo, a busca sem índice do find_by_email.
+        Retorna a quantidade de usuários atualizados.
+        """
+        updated = UserService.backfill_email_index()
+        UserService._unindexed_users = False
+        return updated
+
+    @staticmethod
+    def backfill_email_index(batch_size=500):
+        """
+        Preenche o índice cego dos usuários criados antes da coluna email_index.
+        Retorna a quantidade de usuários atualizados.
+        """
+        updated = 0
+        last_id = 0
+
+        try:
+            while True:
+                users = User.query.filter(User.email_index.is_(None), User.id > last_id) \
+                    .order_by(User.id).limit(batch_size).all()
+                if not users:
+                    break
+
+                last_id = users[-1].id
+                private_keys = KeyManagementService.get_private_keys([user.id for user in users])
+
+                for user in users:
+                    private_key = private_keys.get(user.id)
+                    if private_key is None:
+                        print(f"[WARN] Chave privada não encontrada para usuário ID {user.id}")
+                        continue
+
+                    try:
+                        values = UserService.decrypt_fields(user, private_key)
+                    except Exception as e:
+                        print(f"[WARN] Falha ao descriptografar usuário ID {user.id}: {e}")
+                        continue
+
+                    user.email_index = EncryptionService.blind_index(values['email'])
+                    UserService.upgrade_encryption(user, private_key, values)
+                    updated += 1
+
+                db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            raise e
+
+        return updated
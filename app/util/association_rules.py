@@ -0,0 +1,47 @@
+import pandas as pd
+from mlxtend.frequent_patterns import apriori, association_rules
+
+# Práticas de manejo usadas como itens na mineração das regras
+PRACTICE_COLUMNS = ['water_sources', 'pest_management', 'fertilization', 'irrigation', 'environmental_threats']
+
+# Taxa de sobrevivência acima da qual a medição entra na mineração
+HIGH_SURVIVAL_RATE = 70
+
+
+def _split_feature(feature):
+    parts = feature.split('_')
+    col_name = '_'.join(parts[:-1])
+    value = parts[-1]
+    return col_name, value
+
+
+def mine_association_rules(df, min_support=0.05, min_confidence=0.5, sparse=False):
+    """
+    Regras de associação (apriori) entre as práticas das medições com alta taxa de
+    sobrevivência. df precisa das colunas tree_survival_rate e PRACTICE_COLUMNS.
+    Os itens são codificados como bool (1 byte por célula); sparse=True usa colunas
+    esparsas, que só compensam quando cada prática tem muitos valores distintos.
+    """
+    high_survival_practices = df[df['tree_survival_rate'] > HIGH_SURVIVAL_RATE][PRACTICE_COLUMNS] \
+        .astype('category')
+    practices_dummies = pd.get_dummies(high_survival_practices, dtype=bool, sparse=sparse)
+
+    frequent_itemsets = apriori(practices_dummies, min_support=min_support, use_colnames=True)
+    rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=min_confidence)
+
+    formatted_rules = []
+    for _, rule in rules.iterrows():
+        conseq_item = list(rule['consequents'])[0]
+        conseq_col, conseq_value = _split_feature(conseq_item)
+        formatted_rule = {
+            "antecedents": list(rule['antecedents'])[0].split('_', 1)[1],
+            "confidence": rule['confidence'],
+            "consequents": {
+                conseq_col: conseq_value
+            },
+            "lift": rule['lift'],
+            "support": rule['support']
+        }
+        formatted_rules.append(formatted_rule)
+
+    return formatted_rules
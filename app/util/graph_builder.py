@@ -25,6 +25,7 @@ class GraphBuilder:
         plt.grid(True)
         plt.tight_layout()
         plt.savefig(path, dpi=dpi)
+        plt.close()
 
     def plot_area_evolution(self, data, path, dpi=300):
         df = pd.DataFrame(data)
@@ -78,3 +79,4 @@ class GraphBuilder:
         ax.legend(loc='upper right', bbox_to_anchor=(1.1, 1.1))
         plt.tight_layout()
         plt.savefig(path, dpi=dpi)
+        plt.close()
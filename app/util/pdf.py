@@ -2,8 +2,8 @@ import os
 from markdown_pdf import Section, MarkdownPdf
 
 class MarkdownToPDF:
-    def __init__(self, pdf_name='relatorio.pdf'):
-        self.pdf_path = f'{os.getenv("TEMPORARY_FOLDER_PATH")}/pdf/' + pdf_name
+    def __init__(self, pdf_name='relatorio.pdf', pdf_path=None):
+        self.pdf_path = pdf_path or f'{os.getenv("TEMPORARY_FOLDER_PATH")}/pdf/' + pdf_name
         self.pdf = MarkdownPdf(toc_level=1, optimize=True)
         self.pdf.meta['title'] = 'Reporte'
         self.pdf.meta['author'] = 'Kersys API'
@@ -0,0 +1,55 @@
+import os
+import uuid
+import base64
+import hashlib
+import tempfile
+
+import matplotlib
+matplotlib.use('Agg')
+
+from app.util.pdf import MarkdownToPDF
+from app.util.graph_builder import GraphBuilder
+from app.util.report_messages import graph_analysis
+
+# Incrementar ao mudar o layout dos gráficos ou do PDF; junto com o texto do
+# template, invalida os relatórios já guardados em cache
+REPORT_TEMPLATE_VERSION = '1'
+REPORT_TEMPLATE_FINGERPRINT = '{}-{}'.format(
+    REPORT_TEMPLATE_VERSION, hashlib.sha256(graph_analysis.encode('utf-8')).hexdigest()[:12]
+)
+
+
+def _image_data_uri(path):
+    with open(path, 'rb') as f:
+        encoded = base64.b64encode(f.read()).decode('utf-8')
+    return f"data:image/png;base64,{encoded}"
+
+
+def render_report_pdf(records, output_path):
+    """
+    Gera o PDF do relatório de uma área a partir das medições já carregadas.
+    Não acessa banco nem app Flask, para poder rodar em outro processo; as imagens
+    ficam em um diretório temporário próprio e o PDF é gravado em output_path
+    (primeiro em um arquivo .part próprio, depois renomeado). Retorna output_path.
+    """
+    graph = GraphBuilder()
+    with tempfile.TemporaryDirectory(prefix='report-') as work_dir:
+        path_image_1 = os.path.join(work_dir, 'image_1.png')
+        path_image_2 = os.path.join(work_dir, 'image_2.png')
+        graph.plot_trend_analysis(records, path_image_1)
+        graph.plot_area_evolution(records, path_image_2)
+
+        graph_analysis_formatted = graph_analysis.replace('<<path_image_1>>', _image_data_uri(path_image_1))
+        graph_analysis_formatted = graph_analysis_formatted.replace('<<path_image_2>>', _image_data_uri(path_image_2))
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    partial_path = f'{output_path}.{uuid.uuid4().hex}.part'
+    try:
+        pdf = MarkdownToPDF(pdf_path=partial_path)
+        pdf.add_page(graph_analysis_formatted)
+        pdf.save()
+        os.replace(partial_path, output_path)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    return output_path
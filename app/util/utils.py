@@ -1,3 +1,5 @@
+import os
+import socket
 import unicodedata
 
 from app.initializer import mongo
@@ -28,3 +30,43 @@ def get_city_coordinates(city: str):
     collection = mongo.db.api_cities_coordinates
     geodata =  collection.find_one({"NOME_MUNICIPIO": city.upper()})
     return geodata["LATITUDE"], geodata["LONGITUDE"]
+
+
+def get_list_arg(args, name):
+    """
+    Valores de um parâmetro de query repetido e/ou separado por vírgula (?uf=SP,RJ&uf=MG).
+    """
+    values = []
+    for raw in args.getlist(name):
+        values.extend(value.strip() for value in raw.split(',') if value.strip())
+    return list(dict.fromkeys(values))
+
+
+def process_owner():
+    """
+    Identifica o processo atual (host + pid) para registrar quem executa um job em segundo plano.
+    """
+    return {"host": socket.gethostname(), "pid": os.getpid()}
+
+
+def owner_is_gone(job):
+    """
+    Indica se o processo que executava o job não existe mais. Só é possível afirmar
+    para jobs deste host; jobs sem dono são anteriores ao registro do dono. O pid do
+    próprio processo conta como encerrado: ele acabou de subir e ainda não tem jobs.
+    """
+    if job.get("host") is None:
+        return True
+    if job["host"] != socket.gethostname():
+        return False
+
+    pid = job.get("pid")
+    if pid is None or pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
@@ -0,0 +1,189 @@
+"""
+Benchmark da inferência do modelo de saúde das árvores e da mineração de regras de associação.
+
+Carrega model_v2.pkl, scaler_v2.pkl e columns_used.pkl, gera medições sintéticas com
+os mesmos domínios categóricos servidos por /machine_learning/list (as categorias
+conhecidas pelo modelo) e mede latência (p50/p95/p99) e vazão de:
+
+- predição de um registro (encoder pré-compilado e codificação original com get_dummies);
+- predição em lote para tamanhos crescentes;
+- apriori (mine_association_rules) para quantidades crescentes de medições.
+
+Não precisa de Postgres nem Mongo. Uso (na raiz do projeto):
+
+    python -m benchmarks.ml_inference --output bench_ml.json
+"""
+import argparse
+import json
+import platform
+import time
+from datetime import datetime, timezone
+
+import joblib
+import mlxtend
+import numpy as np
+import pandas as pd
+import sklearn
+
+from app.services.feature_encoder_service import OneHotEncoder, reference_encode
+from app.util.association_rules import PRACTICE_COLUMNS, mine_association_rules
+
+# Faixas das colunas numéricas nas medições sintéticas
+NUMERIC_RANGES = {
+    'number_of_trees_lost': (0, 20),
+    'avoided_co2_emissions_cubic_meters': (0.0, 5.0),
+    'average_tree_growth_cm': (0.0, 200.0),
+    'total_project_cost_brl': (100.0, 5000.0),
+    'living_trees_to_date': (0, 1000),
+    'soil_fertility_index_percent': (0.0, 100.0),
+}
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def synthetic_records(encoder, rows, rng):
+    """
+    Gera rows medições sintéticas: categorias sorteadas entre as conhecidas pelo modelo,
+    numéricos uniformes em NUMERIC_RANGES e tree_survival_rate entre 0 e 100.
+    """
+    data = {}
+    for feature, (low, high) in NUMERIC_RANGES.items():
+        if isinstance(low, int):
+            data[feature] = rng.integers(low, high + 1, rows)
+        else:
+            data[feature] = rng.uniform(low, high, rows).round(2)
+    for feature, values in encoder.categories().items():
+        data[feature] = rng.choice(values, rows)
+    data['tree_survival_rate'] = rng.uniform(0, 100, rows).round(1)
+    return pd.DataFrame(data)
+
+
+def summarize(latencies_s, items_per_call=1):
+    """
+    Percentis de latência (ms) e vazão (itens/s) de uma série de execuções.
+    """
+    latencies_ms = np.asarray(latencies_s) * 1000
+    total_s = float(np.sum(latencies_s))
+    return {
+        'calls': len(latencies_s),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 4),
+        'p99_ms': round(float(np.percentile(latencies_ms, 99)), 4),
+        'mean_ms': round(float(np.mean(latencies_ms)), 4),
+        'throughput_per_s': round(len(latencies_s) * items_per_call / total_s, 2) if total_s else None,
+    }
+
+
+def timed(fn, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_single(model, scaler, encoder, records, iterations):
+    def encoder_path(record):
+        return model.predict(scaler.transform(encoder.to_frame(encoder.encode_record(record))))
+
+    def reference_path(record):
+        return model.predict(scaler.transform(encoder.to_frame(reference_encode([record], encoder.columns))))
+
+    results = {}
+    for name, predict in (('encoder', encoder_path), ('get_dummies', reference_path)):
+        predict(records[0])  # aquecimento
+        latencies = []
+        for i in range(iterations):
+            record = records[i % len(records)]
+            start = time.perf_counter()
+            predict(record)
+            latencies.append(time.perf_counter() - start)
+        results[name] = summarize(latencies)
+    return results
+
+
+def bench_batch(model, scaler, encoder, df, batch_sizes, repeat):
+    results = []
+    for size in batch_sizes:
+        batch = df.iloc[:size]
+        records = batch.to_dict(orient='records')
+        latencies = timed(
+            lambda: model.predict(scaler.transform(encoder.to_frame(encoder.encode_records(records)))), repeat
+        )
+        results.append({'rows': size, **summarize(latencies, items_per_call=size)})
+    return results
+
+
+def bench_apriori(df, row_counts, repeat, min_support, min_confidence):
+    results = []
+    for rows in row_counts:
+        sample = df.iloc[:rows][PRACTICE_COLUMNS + ['tree_survival_rate']]
+        rules = []
+
+        def mine():
+            rules[:] = mine_association_rules(sample, min_support, min_confidence)
+
+        latencies = timed(mine, repeat)
+        results.append({'rows': rows, 'rules': len(rules), **summarize(latencies, items_per_call=rows)})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', default='model_v2.pkl')
+    parser.add_argument('--scaler', default='scaler_v2.pkl')
+    parser.add_argument('--columns', default='columns_used.pkl')
+    parser.add_argument('--iterations', type=int, default=500, help='Chamadas da predição de um registro.')
+    parser.add_argument('--batch-sizes', type=_int_list, default=[1, 10, 100, 1000, 10000])
+    parser.add_argument('--batch-repeat', type=int, default=20, help='Execuções por tamanho de lote.')
+    parser.add_argument('--apriori-rows', type=_int_list, default=[1000, 10000, 100000])
+    parser.add_argument('--apriori-repeat', type=int, default=5, help='Execuções por quantidade de linhas.')
+    parser.add_argument('--min-support', type=float, default=0.05)
+    parser.add_argument('--min-confidence', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Arquivo JSON de saída (padrão: stdout).')
+    args = parser.parse_args(argv)
+
+    load_start = time.perf_counter()
+    model = joblib.load(args.model)
+    scaler = joblib.load(args.scaler)
+    encoder = OneHotEncoder(joblib.load(args.columns))
+    load_ms = (time.perf_counter() - load_start) * 1000
+
+    rng = np.random.default_rng(args.seed)
+    df = synthetic_records(encoder, max(args.batch_sizes + args.apriori_rows + [args.iterations]), rng)
+    single_records = df.iloc[:args.iterations].to_dict(orient='records')
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scikit_learn': sklearn.__version__,
+            'mlxtend': mlxtend.__version__,
+            'model': args.model,
+            'model_type': type(model).__name__,
+            'n_features': encoder.n_features,
+            'seed': args.seed,
+            'load_ms': round(load_ms, 2),
+        },
+        'single': bench_single(model, scaler, encoder, single_records, args.iterations),
+        'batch': bench_batch(model, scaler, encoder, df, args.batch_sizes, args.batch_repeat),
+        'apriori': bench_apriori(df, args.apriori_rows, args.apriori_repeat, args.min_support, args.min_confidence),
+    }
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# Mantém a raiz do projeto no sys.path para os testes importarem o pacote app
@@ -4,12 +4,12 @@ from tkinter.scrolledtext import ScrolledText
 
 from sqlalchemy.orm import sessionmaker
 
-from app.database.sqlite import get_sqlite_session
 from app.models import User
 from app.services.email_service import send_email
 from sqlalchemy import create_engine
 
-from app.services.encryption_service import EncryptionService
+from app.services.user_service import UserService
+from app.services.key_management_service import KeyManagementService
 
 
 class EmailSenderApp:
@@ -92,21 +92,17 @@ class EmailSenderApp:
 
             users = session.query(User).all()
 
-            sqlite_session = get_sqlite_session()
+            private_keys = KeyManagementService.get_private_keys([user.id for user in users])
             emails = []
 
             for user in users:
-                cursor = sqlite_session.execute(
-                    "SELECT private_key FROM user_keys WHERE user_id = ?", (user.id,)
-                )
-                result = cursor.fetchone()
+                private_key = private_keys.get(user.id)
 
-                if not result:
+                if private_key is None:
                     continue
 
-                private_key_pem = result[0]
                 try:
-                    decrypted_email = EncryptionService.decrypt(private_key_pem, user.email)
+                    decrypted_email = UserService.decrypt_fields(user, private_key)['email']
                 except Exception:
                     continue
 
@@ -1,8 +1,58 @@
+import os
+import threading
 from app.controllers import area, company, localization, user, area_information, import_file, reforestation_stage, environment_threats, portability, machine_learn, report
-from app.initializer import app
+from app.initializer import app, mongo
+from app.commands import register_commands
 from app.database.sqlite import init_sqlite_db
+from app.services.key_pool_service import key_pair_pool
+from app.database.mongo import ensure_indexes
+from app.services.import_job_service import ImportJobService
+from app.services.report_job_service import ReportJobService
+from app.services.rollup_service import RollupService
+from app.services.user_service import UserService
 
+register_commands(app)
 init_sqlite_db()
+key_pair_pool.start()
+
+if os.getenv('MONGO_ENSURE_INDEXES', 'true').lower() == 'true':
+    try:
+        ensure_indexes(mongo.db)
+    except Exception as e:
+        print(f'[WARN] Falha ao criar índices do Mongo: {e}')
+
+def build_rollup():
+    # Sem o rollup (primeira subida após a atualização) os gráficos usam as medições brutas até ele ficar pronto
+    try:
+        if RollupService.ensure_built():
+            print('[INFO] Rollup mensal (api_monthly) construído.')
+    except Exception as e:
+        print(f'[WARN] Falha ao construir o rollup mensal: {e}')
+
+threading.Thread(target=build_rollup, name='rollup-build', daemon=True).start()
+
+def backfill_email_index():
+    # Até terminar, login e cadastro procuram os usuários sem email_index descriptografando os registros
+    with app.app_context():
+        try:
+            updated = UserService.ensure_email_index()
+            if updated:
+                print(f'[INFO] Índice de e-mail preenchido para {updated} usuário(s).')
+        except Exception as e:
+            print(f'[WARN] Falha ao preencher o índice de e-mail dos usuários: {e}')
+
+threading.Thread(target=backfill_email_index, name='email-index-backfill', daemon=True).start()
+
+try:
+    ImportJobService.recover_interrupted()
+except Exception as e:
+    print(f'[WARN] Falha ao recuperar jobs de importação interrompidos: {e}')
+
+try:
+    ReportJobService.recover_interrupted()
+except Exception as e:
+    print(f'[WARN] Falha ao recuperar jobs de relatório interrompidos: {e}')
+
 app.register_blueprint(user.users)
 app.register_blueprint(area.areas)
 app.register_blueprint(company.companies)
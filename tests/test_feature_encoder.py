@@ -0,0 +1,27 @@
+import os
+
+import joblib
+import pytest
+
+from app.services.feature_encoder_service import OneHotEncoder, check_parity
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COLUMNS_PATH = os.path.join(ROOT, 'columns_used.pkl')
+
+
+@pytest.fixture(scope='module')
+def encoder():
+    return OneHotEncoder(joblib.load(COLUMNS_PATH))
+
+
+@pytest.mark.parametrize('path', ['record', 'frame'])
+def test_encoder_matches_get_dummies(encoder, path):
+    count, mismatches = check_parity(encoder)
+
+    assert count > 0
+    assert [mismatch for mismatch in mismatches if mismatch['path'] == path] == []
+
+
+def test_encoder_covers_every_model_column(encoder):
+    encoded = len(encoder.numeric_index) + sum(len(values) for values in encoder.categories().values())
+    assert encoded == encoder.n_features